@@ -1,9 +1,10 @@
 """数据库CRUD操作"""
-import json
+import orjson
 from datetime import date
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from . import models, schemas
-from typing import List, Optional, Dict
+from typing import Iterable, Iterator, List, Optional, Dict
 
 
 def get_stock(db: Session, stock_id: int) -> Optional[models.Stock]:
@@ -256,11 +257,37 @@ def get_snapshot(db: Session, stock_id: int, snapshot_date: date) -> Optional[mo
     ).first()
 
 
-def get_snapshots_by_date(db: Session, snapshot_date: date) -> List[models.StockSnapshot]:
-    """获取指定日期的所有快照"""
-    return db.query(models.StockSnapshot).filter(
-        models.StockSnapshot.snapshot_date == snapshot_date
+def get_snapshots_map(db: Session, snapshot_date: date, stock_ids: List[int]) -> Dict[int, models.StockSnapshot]:
+    """批量获取多只股票在指定日期的快照（单次查询），返回 stock_id -> 快照 映射"""
+    if not stock_ids:
+        return {}
+
+    snapshots = db.query(models.StockSnapshot).filter(
+        models.StockSnapshot.snapshot_date == snapshot_date,
+        models.StockSnapshot.stock_id.in_(stock_ids)
     ).all()
+    return {s.stock_id: s for s in snapshots}
+
+
+# 报告计算只需要的快照列（列投影查询，避免构造完整 ORM 对象）
+_SNAPSHOT_REPORT_COLUMNS = (
+    models.StockSnapshot.stock_id,
+    models.StockSnapshot.snapshot_date,
+    models.StockSnapshot.price,
+    models.StockSnapshot.ma_results,
+    models.StockSnapshot.is_reached,
+)
+
+
+def get_snapshots_by_date(db: Session, snapshot_date: date, batch_size: int = 500) -> Iterator[Row]:
+    """获取指定日期的所有快照及对应股票的代码、名称（仅报告所需列，分批流式读取）"""
+    return db.query(
+        *_SNAPSHOT_REPORT_COLUMNS, models.Stock.symbol, models.Stock.name
+    ).outerjoin(
+        models.Stock, models.Stock.id == models.StockSnapshot.stock_id
+    ).filter(
+        models.StockSnapshot.snapshot_date == snapshot_date
+    ).execution_options(stream_results=True).yield_per(batch_size)
 
 
 def get_latest_snapshot_date(db: Session) -> Optional[date]:
@@ -271,13 +298,18 @@ def get_latest_snapshot_date(db: Session) -> Optional[date]:
     return latest.snapshot_date if latest else None
 
 
-def get_previous_trading_day_snapshots(db: Session, current_date: date) -> List[models.StockSnapshot]:
-    """获取当前日期之前最近一个交易日的快照"""
-    return db.query(models.StockSnapshot).filter(
+def get_previous_trading_day_snapshots(db: Session, current_date: date) -> List[Row]:
+    """获取当前日期之前最近一个交易日的快照（仅报告所需列）"""
+    return db.query(*_SNAPSHOT_REPORT_COLUMNS).filter(
         models.StockSnapshot.snapshot_date < current_date
     ).order_by(models.StockSnapshot.snapshot_date.desc()).limit(100).all()
 
 
+def _any_reached(ma_results: Dict) -> bool:
+    """判断快照中是否任一 MA 达标"""
+    return any(r.get("reached_target", False) for r in ma_results.values())
+
+
 def create_or_update_snapshot(
     db: Session,
     stock_id: int,
@@ -288,11 +320,13 @@ def create_or_update_snapshot(
     """创建或更新快照（每只股票每天只有一份快照）"""
     existing = get_snapshot(db, stock_id, snapshot_date)
 
-    ma_results_json = json.dumps(ma_results, ensure_ascii=False)
+    ma_results_json = orjson.dumps(ma_results).decode()
+    is_reached = _any_reached(ma_results)
 
     if existing:
         existing.price = price
         existing.ma_results = ma_results_json
+        existing.is_reached = is_reached
         db.commit()
         db.refresh(existing)
         return existing
@@ -301,7 +335,8 @@ def create_or_update_snapshot(
             stock_id=stock_id,
             snapshot_date=snapshot_date,
             price=price,
-            ma_results=ma_results_json
+            ma_results=ma_results_json,
+            is_reached=is_reached
         )
         db.add(db_snapshot)
         db.commit()
@@ -309,26 +344,104 @@ def create_or_update_snapshot(
         return db_snapshot
 
 
-def get_snapshots_for_trend(db: Session, days: int = 7) -> Dict[date, List[models.StockSnapshot]]:
-    """获取最近 N 天的快照数据，按日期分组"""
+# 批量 upsert 每条语句的行数（每行 5 个绑定参数，控制在 SQLite 变量数上限以内）
+SNAPSHOT_UPSERT_CHUNK = 500
+
+
+def bulk_upsert_snapshots(db: Session, rows: List[Dict]) -> int:
+    """
+    批量创建或更新快照（分块 INSERT ... ON CONFLICT DO UPDATE，一次提交）
+
+    Args:
+        db: 数据库会话
+        rows: 快照数据列表，每项包含 stock_id, snapshot_date, price, ma_results(dict)
+
+    Returns:
+        int: 写入的记录数
+    """
+    from sqlalchemy.dialects.sqlite import insert
+
+    if not rows:
+        return 0
+
+    values = [
+        {
+            "stock_id": row["stock_id"],
+            "snapshot_date": row["snapshot_date"],
+            "price": row["price"],
+            "ma_results": orjson.dumps(row["ma_results"]).decode(),
+            "is_reached": _any_reached(row["ma_results"]),
+        }
+        for row in rows
+    ]
+
+    for start in range(0, len(values), SNAPSHOT_UPSERT_CHUNK):
+        stmt = insert(models.StockSnapshot).values(values[start:start + SNAPSHOT_UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["stock_id", "snapshot_date"],
+            set_={
+                "price": stmt.excluded.price,
+                "ma_results": stmt.excluded.ma_results,
+                "is_reached": stmt.excluded.is_reached,
+            }
+        )
+        db.execute(stmt)
+    db.commit()
+    return len(values)
+
+
+def backfill_snapshot_reached(db: Session) -> int:
+    """
+    为 is_reached 为空的历史快照回填达标标记
+
+    由 SQLite json1 在库内展开 ma_results 判断，无需逐行加载到 Python 解析
+    """
+    from sqlalchemy import text
+
+    result = db.execute(text(
+        "UPDATE stock_snapshots SET is_reached = CASE WHEN json_valid(ma_results) THEN EXISTS ("
+        "  SELECT 1 FROM json_each(stock_snapshots.ma_results) j"
+        "  WHERE json_extract(j.value, '$.reached_target') = 1"
+        ") ELSE 0 END WHERE is_reached IS NULL"
+    ))
+    db.commit()
+    return result.rowcount
+
+
+def get_snapshots_for_trend(db: Session, days: int = 7) -> List[Dict]:
+    """
+    获取最近 N 个快照日的达标统计（单条 GROUP BY 聚合，无需解析 JSON）
+
+    Args:
+        db: 数据库会话
+        days: 快照日数量
+
+    Returns:
+        List[Dict]: 按日期升序的统计列表，每项包含 date, total, reached
+    """
     from datetime import timedelta
+    from sqlalchemy import func, case
 
     end_date = date.today()
     start_date = end_date - timedelta(days=days + 7)  # 多取几天以包含非交易日
 
-    snapshots = db.query(models.StockSnapshot).filter(
+    rows = db.query(
+        models.StockSnapshot.snapshot_date,
+        func.count().label("total"),
+        func.sum(case((models.StockSnapshot.is_reached, 1), else_=0)).label("reached")
+    ).filter(
         models.StockSnapshot.snapshot_date >= start_date,
         models.StockSnapshot.snapshot_date <= end_date
-    ).order_by(models.StockSnapshot.snapshot_date).all()
-
-    # 按日期分组
-    result = {}
-    for snapshot in snapshots:
-        if snapshot.snapshot_date not in result:
-            result[snapshot.snapshot_date] = []
-        result[snapshot.snapshot_date].append(snapshot)
+    ).group_by(
+        models.StockSnapshot.snapshot_date
+    ).order_by(
+        models.StockSnapshot.snapshot_date.desc()
+    ).limit(days).all()
 
-    return result
+    return [
+        {"date": row.snapshot_date, "total": row.total, "reached": row.reached or 0}
+        for row in reversed(rows)
+    ]
 
 
 def count_today_snapshots(db: Session, snapshot_date: date) -> int:
@@ -374,6 +487,17 @@ def get_trading_calendar_by_date(db: Session, trade_date: date) -> Optional[mode
     ).first()
 
 
+def get_trading_calendars_for_dates(db: Session, dates: Iterable[date]) -> Dict[date, models.TradingCalendar]:
+    """批量获取多个日期的交易日历记录（一次 IN 查询），返回 日期 -> 记录"""
+    dates = list(dates)
+    if not dates:
+        return {}
+    calendars = db.query(models.TradingCalendar).filter(
+        models.TradingCalendar.trade_date.in_(dates)
+    ).all()
+    return {c.trade_date: c for c in calendars}
+
+
 def get_trading_calendar_by_year(db: Session, year: int) -> List[models.TradingCalendar]:
     """获取指定年份的所有交易日历记录"""
     return db.query(models.TradingCalendar).filter(
@@ -395,9 +519,11 @@ def is_year_cached(db: Session, year: int) -> bool:
 def batch_create_trading_calendar(db: Session, calendar_data: List[Dict]) -> int:
     """批量创建交易日历记录"""
     created_count = 0
+    # 一次查询取出已存在的记录，避免逐日查询
+    existing_map = get_trading_calendars_for_dates(db, [item["trade_date"] for item in calendar_data])
     for item in calendar_data:
         # 检查是否已存在
-        existing = get_trading_calendar_by_date(db, item["trade_date"])
+        existing = existing_map.get(item["trade_date"])
         if existing:
             # 更新现有记录
             existing.is_trading_day = item["is_trading_day"]
@@ -1,7 +1,7 @@
 """FastAPI应用主入口"""
 import time
 import uuid
-import json
+import orjson
 from datetime import date
 from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
@@ -21,6 +21,44 @@ logger = get_logger()
 models.Base.metadata.create_all(bind=engine)
 
 
+def upgrade_schema():
+    """为已存在的表补齐新增列和索引（create_all 不会修改已有表）"""
+    from sqlalchemy import inspect, text
+
+    snapshot_columns = {c["name"] for c in inspect(engine).get_columns("stock_snapshots")}
+    if "is_reached" not in snapshot_columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE stock_snapshots ADD COLUMN is_reached BOOLEAN"))
+        logger.info("[数据库升级] stock_snapshots 新增列 is_reached")
+
+    # 唯一索引创建前先清理重复快照（旧版先查后插不保证唯一），每个 (股票, 日期) 保留 id 最大的一条
+    snapshot_indexes = {i["name"] for i in inspect(engine).get_indexes("stock_snapshots")}
+    if "uq_snapshot_stock_date" not in snapshot_indexes:
+        with engine.begin() as conn:
+            removed = conn.execute(text(
+                "DELETE FROM stock_snapshots WHERE id NOT IN ("
+                "  SELECT MAX(id) FROM stock_snapshots GROUP BY stock_id, snapshot_date"
+                ")"
+            )).rowcount
+        if removed:
+            logger.info(f"[数据库升级] 清理重复快照: {removed} 条")
+
+    for index in models.StockSnapshot.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    db = next(get_db())
+    try:
+        backfilled = crud.backfill_snapshot_reached(db)
+        if backfilled:
+            logger.info(f"[数据库升级] 回填快照达标标记: {backfilled} 条")
+    finally:
+        db.close()
+
+
+# 应用启动时升级表结构
+upgrade_schema()
+
+
 def init_default_rules():
     """初始化默认交易规则"""
     from .services.rule_engine import get_default_rules
@@ -69,7 +107,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         request_id_context.set(request_id)
 
         # 记录请求开始
-        start_time = time.time()
+        start_time = time.monotonic()
 
         logger.info(
             "请求开始",
@@ -87,7 +125,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
 
             # 计算耗时
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.monotonic() - start_time) * 1000
 
             # 记录请求完成
             logger.info(
@@ -107,7 +145,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
 
         except Exception as e:
             # 计算耗时
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.monotonic() - start_time) * 1000
 
             # 记录异常
             logger.error(
@@ -287,6 +325,8 @@ def update_stock(stock_id: int, stock_update: schemas.StockUpdate, db: Session =
     updated_stock = crud.update_stock(db, stock_id=stock_id, stock_update=stock_update)
     if updated_stock is None:
         raise HTTPException(status_code=404, detail="未找到该股票")
+    # 股票名称、指标变化会影响每日报告，报告缓存失效
+    services.report_cache.clear()
     # 修改指标需要重新计算，设置 need_calc=True
     return services.enrich_stock_with_status(updated_stock, db=db, need_calc=True)
 
@@ -294,6 +334,8 @@ def update_stock(stock_id: int, stock_update: schemas.StockUpdate, db: Session =
 def delete_stock(stock_id: int, db: Session = Depends(get_db)):
     if not crud.delete_stock(db, stock_id=stock_id):
         raise HTTPException(status_code=404, detail="未找到该股票")
+    # 股票已删除，报告缓存失效
+    services.report_cache.clear()
     return None
 
 @app.post("/stocks/symbol/{symbol}/update-price", response_model=schemas.PriceUpdateResponse, tags=["价格查询"])
@@ -469,7 +511,6 @@ def generate_snapshots(
     - 历史交易日: 使用 K 线收盘价
     """
     from datetime import datetime as dt
-    from zoneinfo import ZoneInfo
 
     if target_date is None:
         target_date = date.today()
@@ -490,13 +531,10 @@ def generate_snapshots(
 
     # 当日快照：检查是否已收盘
     if target_date == date.today():
-        beijing_tz = ZoneInfo("Asia/Shanghai")
-        now_beijing = dt.now(beijing_tz)
-        current_time = now_beijing.time()
+        current_time = dt.now(services.BEIJING_TZ).time()
 
         # A股收盘时间为 15:00
-        from datetime import time as t
-        if current_time <= t(15, 0):
+        if current_time <= services.CN_AFTERNOON_END:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={
@@ -818,7 +856,6 @@ def get_stock_signal(symbol: str, db: Session = Depends(get_db)):
 
     基于技术指标（MA/MACD/RSI/KDJ/布林带）生成买入/卖出信号
     """
-    import json
     from .services.signals import generate_signal, format_signal_for_db
     from .providers import get_coordinator
 
@@ -882,7 +919,6 @@ def generate_signals(
 
     为指定股票或所有股票生成信号并保存到数据库
     """
-    import json
     import pandas as pd
     from .services.signals import generate_signal, format_signal_for_db
     from .providers import get_coordinator
@@ -902,7 +938,7 @@ def generate_signals(
     for stock in stocks:
         try:
             # 获取 K 线数据
-            normalized_code, market = services.normalize_symbol_for_sina(stock.symbol)
+            normalized_code, market = stock.sina_code, stock.market
             kline_data, provider_name, _ = coordinator.get_kline_data(stock.symbol, normalized_code, market, datalen=60)
 
             if not kline_data or len(kline_data) < 20:
@@ -998,8 +1034,8 @@ def list_signals(
 
     result = []
     for s in signals:
-        triggers = json.loads(s.triggers) if s.triggers else []
-        indicators = json.loads(s.indicators) if s.indicators else {}
+        triggers = orjson.loads(s.triggers) if s.triggers else []
+        indicators = orjson.loads(s.indicators) if s.indicators else {}
 
         result.append(schemas.SignalResponse(
             id=s.id,
@@ -1025,8 +1061,8 @@ def list_signals(
 
 def _convert_rule_to_response(rule: models.TradingRule) -> schemas.TradingRuleResponse:
     """将数据库规则对象转换为响应格式（解析 JSON 字符串）"""
-    conditions_data = json.loads(rule.conditions) if rule.conditions else []
-    price_config_data = json.loads(rule.price_config) if rule.price_config else {}
+    conditions_data = orjson.loads(rule.conditions) if rule.conditions else []
+    price_config_data = orjson.loads(rule.price_config) if rule.price_config else {}
 
     return schemas.TradingRuleResponse(
         id=rule.id,
@@ -1088,8 +1124,8 @@ def create_rule(rule: schemas.TradingRuleCreate, db: Session = Depends(get_db)):
 
     # 验证 conditions 和 price_config 是有效的 JSON
     try:
-        conditions = json.dumps([c.model_dump() for c in rule.conditions])
-        price_config = json.dumps(rule.price_config.model_dump())
+        conditions = orjson.dumps([c.model_dump() for c in rule.conditions]).decode()
+        price_config = orjson.dumps(rule.price_config.model_dump()).decode()
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"配置格式错误: {str(e)}")
 
@@ -1128,10 +1164,10 @@ def update_rule(rule_id: int, rule: schemas.TradingRuleUpdate, db: Session = Dep
 
     # 处理 conditions 和 price_config 的 JSON 序列化
     if "conditions" in update_data and update_data["conditions"] is not None:
-        update_data["conditions"] = json.dumps([c.model_dump() for c in update_data["conditions"]])
+        update_data["conditions"] = orjson.dumps([c.model_dump() for c in update_data["conditions"]]).decode()
 
     if "price_config" in update_data and update_data["price_config"] is not None:
-        update_data["price_config"] = json.dumps(update_data["price_config"].model_dump())
+        update_data["price_config"] = orjson.dumps(update_data["price_config"].model_dump()).decode()
 
     for key, value in update_data.items():
         setattr(db_rule, key, value)
@@ -1171,6 +1207,7 @@ def recalculate_signals(
     使用当前启用的规则重新计算指定股票或所有股票的信号
     """
     from .services.signals import generate_signal, format_signal_for_db
+    from .services.rule_engine import RuleEngine
     from .providers import get_coordinator
     import pandas as pd
 
@@ -1195,6 +1232,9 @@ def recalculate_signals(
             error_count=0
         )
 
+    # 规则只解析、编译一次，所有股票共用
+    engine = RuleEngine(rules)
+
     coordinator = get_coordinator()
     success_count = 0
     error_count = 0
@@ -1202,22 +1242,23 @@ def recalculate_signals(
     for stock in stocks:
         try:
             # 获取 K 线数据
-            normalized_code, market = services.normalize_symbol_for_sina(stock.symbol)
-            df = coordinator.get_kline_data(normalized_code, market, "daily", count=60)
+            normalized_code, market = stock.sina_code, stock.market
+            kline_data, _, _ = coordinator.get_kline_data(stock.symbol, normalized_code, market, datalen=60)
 
-            if df is None or len(df) < 20:
+            if not kline_data or len(kline_data) < 20:
                 logger.warning(f"[信号重算] 数据不足 | 股票: {stock.symbol}")
                 error_count += 1
                 continue
 
-            # 数据类型转换
+            # 转换为 DataFrame 并做数据类型转换
+            df = pd.DataFrame(kline_data)
             df['close'] = df['close'].astype(float)
             df['high'] = df['high'].astype(float)
             df['low'] = df['low'].astype(float)
             df['open'] = df['open'].astype(float)
 
             # 使用规则引擎生成信号
-            signal_result = generate_signal(df, stock.current_price, rules=rules)
+            signal_result = generate_signal(df, stock.current_price, engine=engine)
             signal_result["current_price"] = stock.current_price
 
             # 保存到数据库
@@ -1,7 +1,7 @@
 """数据库模型定义"""
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Table, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Table, Text, Boolean, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 from .database import Base
 
 
@@ -44,6 +44,25 @@ class Stock(Base):
     # 建立与分组的多对多关联
     groups = relationship("Group", secondary=stock_group_association, back_populates="stocks")
 
+    @property
+    def sina_code(self) -> str:
+        """新浪接口代码（由 symbol 推导，按代码缓存，不落库）"""
+        from .services import normalize_symbol_for_sina
+        return normalize_symbol_for_sina(self.symbol)[0]
+
+    @property
+    def market(self) -> str:
+        """市场类型 cn/us（由 symbol 推导，按代码缓存，不落库）"""
+        from .services import normalize_symbol_for_sina
+        return normalize_symbol_for_sina(self.symbol)[1]
+
+    @property
+    def updated_at_utc(self):
+        """时区感知的更新时间（数据库按 UTC 存储无时区时间）"""
+        if self.updated_at is None or self.updated_at.tzinfo is not None:
+            return self.updated_at
+        return self.updated_at.replace(tzinfo=timezone.utc)
+
     def __repr__(self):
         return f"<Stock {self.symbol}: {self.name}>"
 
@@ -51,12 +70,19 @@ class Stock(Base):
 class StockSnapshot(Base):
     """股票快照模型 - 存储每日指标状态"""
     __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        # 每只股票每天只有一份快照，同时作为批量 upsert 的冲突键
+        Index("uq_snapshot_stock_date", "stock_id", "snapshot_date", unique=True),
+        # 按日期查询/聚合的覆盖索引（SQLite 不支持 INCLUDE，is_reached 作为尾列）
+        Index("ix_snapshot_date_stock", "snapshot_date", "stock_id", "is_reached"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=False, comment="关联股票ID")
     snapshot_date = Column(Date, nullable=False, comment="快照日期")
     price = Column(Float, nullable=True, comment="当日价格")
     ma_results = Column(Text, nullable=True, comment="MA指标结果(JSON格式)")
+    is_reached = Column(Boolean, nullable=True, index=True, comment="是否任一MA达标(写入时计算)")
 
     created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
 
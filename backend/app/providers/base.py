@@ -11,8 +11,38 @@ from typing import Optional, Dict, List, Tuple, Set
 from enum import Enum
 import logging
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 logger = logging.getLogger(__name__)
 
+# HTTP 连接池参数：批量富化的多个线程共享同一 session，连接池需不小于并发数
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 64
+
+
+def create_http_session(headers: Dict[str, str]) -> requests.Session:
+    """
+    创建带连接池和网关错误重试的 HTTP session
+
+    Args:
+        headers: 默认请求头
+
+    Returns:
+        requests.Session: 已挂载连接池适配器的 session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive", **headers})
+    return session
+
 
 class ProviderStatus(Enum):
     """数据源状态"""
@@ -123,6 +153,18 @@ class DataProvider(ABC):
         """
         pass
 
+    def get_realtime_prices_batch(self, items: List[Tuple[str, str, str]]) -> Dict[str, StockData]:
+        """
+        批量获取实时价格（可选实现，需在 CAPABILITIES 中声明 "realtime_batch"）
+
+        Args:
+            items: [(原始代码, 规范化代码, 市场类型), ...]
+
+        Returns:
+            Dict[原始代码, StockData]，未获取到的股票不包含在结果中
+        """
+        raise NotImplementedError(f"[{self.NAME}] 不支持批量行情获取")
+
     @abstractmethod
     def get_kline_data(self, symbol: str, normalized_code: str, market: str,
                        datalen: int = 30) -> Optional[List[Dict]]:
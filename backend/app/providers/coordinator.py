@@ -12,6 +12,8 @@ from typing import Optional, List, Dict, Tuple
 from datetime import datetime, date
 from dataclasses import dataclass
 
+from cachetools import TTLCache
+
 from .base import DataProvider, StockData, ProviderStatus
 from .sina import SinaProvider
 from .eastmoney import EastMoneyProvider
@@ -59,6 +61,10 @@ class DataSourceCoordinator:
     MIN_REQUEST_INTERVAL = 0.2  # 200ms
     # 连续失败阈值
     MAX_CONSECUTIVE_FAILURES = 3
+    # 批量行情单次请求的最大股票数
+    BATCH_QUOTE_SIZE = 50
+    # K 线负结果缓存时间（秒）：所有数据源均无数据的股票（停牌、退市等）短期内不再重试
+    KLINE_NEGATIVE_TTL = 300
 
     def __init__(self):
         # 初始化所有数据源
@@ -77,17 +83,21 @@ class DataSourceCoordinator:
         self._last_request_time = 0.0
         self._request_lock = threading.Lock()
 
+        # K 线负结果缓存：(规范化代码, 日期) -> True（TTLCache 非线程安全，线程池并发访问需加锁）
+        self._kline_negative_cache = TTLCache(maxsize=5000, ttl=self.KLINE_NEGATIVE_TTL)
+        self._kline_negative_lock = threading.Lock()
+
         logger.info(f"[数据协调器] 初始化完成 | 数据源: {[p.NAME for p in self.providers]}")
 
     def _wait_for_rate_limit(self):
         """请求限流，确保请求间隔不低于最小值"""
         with self._request_lock:
-            now = time.time()
+            now = time.monotonic()
             elapsed = now - self._last_request_time
             if elapsed < self.MIN_REQUEST_INTERVAL:
                 wait_time = self.MIN_REQUEST_INTERVAL - elapsed
                 time.sleep(wait_time)
-            self._last_request_time = time.time()
+            self._last_request_time = time.monotonic()
 
     def get_available_providers(self) -> List[DataProvider]:
         """获取所有可用的数据源（按优先级排序）"""
@@ -116,12 +126,12 @@ class DataSourceCoordinator:
                 continue
 
             tried_providers.append(provider.NAME)
-            logger.info(f"[数据协调器] 尝试数据源: {provider.NAME} | 股票: {symbol}")
+            logger.debug("[数据协调器] 尝试数据源: %s | 股票: %s", provider.NAME, symbol)
 
             try:
                 data = provider.get_realtime_price(symbol, normalized_code, market)
                 if data and data.is_valid():
-                    logger.info(f"[数据协调器] 获取成功 | 数据源: {provider.NAME} | 股票: {symbol} | 价格: {data.current_price}")
+                    logger.debug("[数据协调器] 获取成功 | 数据源: %s | 股票: %s | 价格: %s", provider.NAME, symbol, data.current_price)
                     return FetchResult(
                         success=True,
                         data=data,
@@ -144,6 +154,43 @@ class DataSourceCoordinator:
             tried_providers=tried_providers
         )
 
+    def get_realtime_prices_batch(self, items: List[Tuple[str, str, str]]) -> Dict[str, StockData]:
+        """
+        批量获取实时价格（按 BATCH_QUOTE_SIZE 分片，每片一次 HTTP 请求）
+
+        仅使用声明了 "realtime_batch" 能力的数据源，未获取到的股票不在结果中，
+        由调用方逐只走 get_realtime_price 兜底。
+
+        Args:
+            items: [(原始代码, 规范化代码, 市场类型), ...]
+
+        Returns:
+            Dict[str, StockData]: 原始代码 -> 行情数据
+        """
+        results: Dict[str, StockData] = {}
+        pending = list(items)
+
+        for provider in self._get_capable_providers("realtime_batch"):
+            if not pending:
+                break
+
+            for i in range(0, len(pending), self.BATCH_QUOTE_SIZE):
+                chunk = pending[i:i + self.BATCH_QUOTE_SIZE]
+                self._wait_for_rate_limit()
+                try:
+                    data = provider.get_realtime_prices_batch(chunk)
+                except Exception as e:
+                    logger.error(f"[数据协调器] 数据源 {provider.NAME} 批量请求异常 | 数量: {len(chunk)} | 错误: {e}")
+                    continue
+                for symbol, stock_data in data.items():
+                    if stock_data and stock_data.is_valid():
+                        results[symbol] = stock_data
+
+            pending = [item for item in pending if item[0] not in results]
+
+        logger.debug("[数据协调器] 批量行情 | 请求: %s | 成功: %s", len(items), len(results))
+        return results
+
     def get_kline_data(self, symbol: str, normalized_code: str, market: str,
                        datalen: int = 30) -> Tuple[Optional[List[Dict]], str, List[str]]:
         """
@@ -158,27 +205,42 @@ class DataSourceCoordinator:
         Returns:
             Tuple[Optional[List[Dict]], str, List[str]]: (K线数据, 数据源名称, 尝试过的数据源列表)
         """
+        # 近期所有数据源均无数据，直接返回，避免每轮都把全部数据源试一遍
+        negative_key = (normalized_code, date.today())
+        with self._kline_negative_lock:
+            negative_hit = self._kline_negative_cache.get(negative_key)
+        if negative_hit:
+            logger.debug("[数据协调器] K线负结果缓存命中 | 股票: %s", symbol)
+            return None, "", []
+
         self._wait_for_rate_limit()
 
         tried_providers = []
+        had_exception = False
 
         for provider in self.providers:
             if not provider.is_available():
                 continue
 
             tried_providers.append(provider.NAME)
-            logger.info(f"[数据协调器] 尝试获取K线 | 数据源: {provider.NAME} | 股票: {symbol}")
+            logger.debug("[数据协调器] 尝试获取K线 | 数据源: %s | 股票: %s", provider.NAME, symbol)
 
             try:
                 kline_data = provider.get_kline_data(symbol, normalized_code, market, datalen)
                 if kline_data and len(kline_data) > 0:
-                    logger.info(f"[数据协调器] K线获取成功 | 数据源: {provider.NAME} | 股票: {symbol} | 数量: {len(kline_data)}")
+                    logger.debug("[数据协调器] K线获取成功 | 数据源: %s | 股票: %s | 数量: %s", provider.NAME, symbol, len(kline_data))
                     return kline_data, provider.NAME, tried_providers
 
             except Exception as e:
                 logger.error(f"[数据协调器] K线获取异常 | 数据源: {provider.NAME} | 股票: {symbol} | 错误: {e}")
+                had_exception = True
 
         logger.error(f"[数据协调器] K线获取失败 | 股票: {symbol} | 尝试过: {tried_providers}")
+        # 仅在数据源确实返回了空数据时记录负结果：
+        # 全部数据源冷却中、或有数据源抛出异常（超时、网络错误等）都属于暂时不可用，不缓存
+        if tried_providers and not had_exception:
+            with self._kline_negative_lock:
+                self._kline_negative_cache[negative_key] = True
         return None, "", tried_providers
 
     def get_stock_name(self, symbol: str, normalized_code: str, market: str) -> Tuple[Optional[str], str]:
@@ -358,6 +420,8 @@ class DataSourceCoordinator:
         """重置所有数据源的状态"""
         for provider in self.providers:
             provider.health = type(provider.health)()
+        with self._kline_negative_lock:
+            self._kline_negative_cache.clear()
         logger.info("[数据协调器] 重置所有数据源状态")
 
 
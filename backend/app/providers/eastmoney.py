@@ -242,7 +242,7 @@ class EastMoneyProvider(DataProvider):
                 return None
 
             self.record_success()
-            logger.info(f"[东方财富] K线数据获取成功 | 股票: {symbol} | 数量: {len(kline_list)}")
+            logger.debug("[东方财富] K线数据获取成功 | 股票: %s | 数量: %s", symbol, len(kline_list))
             return kline_list
 
         except Exception as e:
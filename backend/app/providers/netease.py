@@ -7,17 +7,16 @@
 
 import logging
 import requests
-import json
+import orjson
 from typing import Optional, List, Dict
 from datetime import datetime
 
-from .base import DataProvider, StockData
+from .base import DataProvider, StockData, create_http_session
 
 logger = logging.getLogger(__name__)
 
-# 创建带有 User-Agent 的 session
-_session = requests.Session()
-_session.headers.update({
+# 创建带有 User-Agent 和连接池的 session
+_session = create_http_session({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 })
 
@@ -72,7 +71,7 @@ class NeteaseProvider(DataProvider):
         try:
             # 网易返回 JSONP 格式: _ntes_quote_callback({"600000":{"code":"600000",...}});
             text = response.text
-            match = json.loads(text[text.index('{'):text.rindex('}')+1])
+            match = orjson.loads(text[text.index('{'):text.rindex('}')+1])
 
             if not match:
                 logger.warning(f"[网易] 数据格式异常 | 股票: {symbol}")
@@ -103,7 +102,7 @@ class NeteaseProvider(DataProvider):
                 provider_name=self.NAME
             )
 
-        except (json.JSONDecodeError, ValueError, KeyError, IndexError) as e:
+        except (orjson.JSONDecodeError, ValueError, KeyError, IndexError) as e:
             logger.error(f"[网易] 数据解析异常 | 股票: {symbol} | 错误: {e}")
             self.record_failure()
             return None
@@ -168,7 +167,7 @@ class NeteaseProvider(DataProvider):
             kline_list.reverse()
 
             self.record_success()
-            logger.info(f"[网易] K线数据获取成功 | 股票: {symbol} | 数量: {len(kline_list)}")
+            logger.debug("[网易] K线数据获取成功 | 股票: %s | 数量: %s", symbol, len(kline_list))
             return kline_list
 
         except Exception as e:
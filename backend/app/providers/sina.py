@@ -6,31 +6,37 @@
 """
 
 import re
-import json
+import orjson
 import logging
 import time
 import requests
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
-from .base import DataProvider, StockData
+from .base import DataProvider, StockData, create_http_session
 
 logger = logging.getLogger(__name__)
 
-# 创建带有 User-Agent 的 session
-_session = requests.Session()
-_session.headers.update({
+# 创建带有 User-Agent 和连接池的 session
+_session = create_http_session({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Referer': 'http://finance.sina.com.cn'
 })
 
+# 行情数据提取: var hq_str_xxx="..."
+_RE_QUOTE = re.compile(r'="([^"]+)"')
+# 批量行情逐行提取: 代码 + 数据
+_RE_QUOTE_LINE = re.compile(r'hq_str_(\w+)="([^"]*)"')
+# 美股 JSONP 中的 JSON 数组
+_RE_JSON_ARRAY = re.compile(r'\[.*\]')
+
 
 class SinaProvider(DataProvider):
     """新浪财经数据源 (L1 - 最高优先级)"""
 
     PRIORITY = 1
     NAME = "sina"
-    CAPABILITIES = {"realtime_price", "kline_data"}
+    CAPABILITIES = {"realtime_price", "realtime_batch", "kline_data"}
 
     def _http_get(self, url: str, timeout: int = 5) -> Optional[requests.Response]:
         """
@@ -89,18 +95,70 @@ class SinaProvider(DataProvider):
             self.record_failure()
             return None
 
-        try:
-            # 解析返回数据: var hq_str_sh600000="浦发银行,10.50,10.40,10.55,..."
-            match = re.search(r'="([^"]+)"', response.text)
-            if not match:
-                logger.warning(f"[新浪] 数据格式异常 | 股票: {symbol}")
-                self.record_failure()
-                return None
+        # 解析返回数据: var hq_str_sh600000="浦发银行,10.50,10.40,10.55,..."
+        match = _RE_QUOTE.search(response.text)
+        if not match:
+            logger.warning(f"[新浪] 数据格式异常 | 股票: {symbol}")
+            self.record_failure()
+            return None
+
+        stock_data = self._parse_quote(symbol, market, match.group(1))
+        if stock_data is None:
+            self.record_failure()
+            return None
+
+        self.record_success()
+        return stock_data
+
+    def get_realtime_prices_batch(self, items: List[Tuple[str, str, str]]) -> Dict[str, StockData]:
+        """
+        批量获取实时价格（一次请求返回多只股票）
+
+        新浪行情接口支持逗号分隔的多个代码:
+        http://hq.sinajs.cn/list=sh600000,sz000001,gb_aapl
+        """
+        code_to_item = {}
+        for symbol, normalized_code, market in items:
+            code = normalized_code if market == "cn" else f"gb_{normalized_code.lower()}"
+            code_to_item[code] = (symbol, market)
+
+        url = f"http://hq.sinajs.cn/list={','.join(code_to_item)}"
+        response = self._http_get(url)
+        if response is None:
+            self.record_failure()
+            return {}
+
+        results = {}
+        for code, raw in _RE_QUOTE_LINE.findall(response.text):
+            item = code_to_item.get(code)
+            if item is None or not raw:
+                continue
+            stock_data = self._parse_quote(item[0], item[1], raw)
+            if stock_data is not None:
+                results[item[0]] = stock_data
+
+        if results:
+            self.record_success()
+        else:
+            self.record_failure()
+        return results
+
+    def _parse_quote(self, symbol: str, market: str, raw: str) -> Optional[StockData]:
+        """
+        解析单只股票的行情字符串
+
+        Args:
+            symbol: 原始股票代码
+            market: 市场类型
+            raw: 引号内的行情字段，逗号分隔
 
-            data = match.group(1).split(',')
+        Returns:
+            StockData 或 None（字段不足、价格无效）
+        """
+        try:
+            data = raw.split(',')
             if len(data) < 4:
                 logger.warning(f"[新浪] 数据字段不足 | 股票: {symbol}")
-                self.record_failure()
                 return None
 
             if market == "cn":
@@ -127,10 +185,8 @@ class SinaProvider(DataProvider):
             # 价格为 0 表示无效数据（停牌、退市等）
             if current_price is None or current_price <= 0:
                 logger.warning(f"[新浪] 价格无效 | 股票: {symbol} | 价格: {current_price}")
-                self.record_failure()
                 return None
 
-            self.record_success()
             return StockData(
                 symbol=symbol,
                 name=name,
@@ -146,7 +202,6 @@ class SinaProvider(DataProvider):
 
         except (ValueError, IndexError) as e:
             logger.error(f"[新浪] 数据解析异常 | 股票: {symbol} | 错误: {e}")
-            self.record_failure()
             return None
 
     def get_kline_data(self, symbol: str, normalized_code: str, market: str,
@@ -171,10 +226,10 @@ class SinaProvider(DataProvider):
         try:
             if market == "us":
                 # 美股返回 JSONP 格式，需要提取 JSON 部分
-                match = re.search(r'\[.*\]', response.text)
-                data = json.loads(match.group()) if match else []
+                match = _RE_JSON_ARRAY.search(response.text)
+                data = orjson.loads(match.group()) if match else []
             else:
-                data = response.json()
+                data = orjson.loads(response.content)
 
             if not data or not isinstance(data, list):
                 logger.warning(f"[新浪] K线数据为空 | 股票: {symbol}")
@@ -202,10 +257,10 @@ class SinaProvider(DataProvider):
                 return None
 
             self.record_success()
-            logger.info(f"[新浪] K线数据获取成功 | 股票: {symbol} | 数量: {len(kline_list)}")
+            logger.debug("[新浪] K线数据获取成功 | 股票: %s | 数量: %s", symbol, len(kline_list))
             return kline_list
 
-        except (json.JSONDecodeError, ValueError) as e:
+        except (orjson.JSONDecodeError, ValueError) as e:
             logger.error(f"[新浪] K线数据解析异常 | 股票: {symbol} | 错误: {e}")
             self.record_failure()
             return None
@@ -8,26 +8,30 @@
 import re
 import logging
 import requests
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
-from .base import DataProvider, StockData
+from .base import DataProvider, StockData, create_http_session
 
 logger = logging.getLogger(__name__)
 
-# 创建带有 User-Agent 的 session
-_session = requests.Session()
-_session.headers.update({
+# 创建带有 User-Agent 和连接池的 session
+_session = create_http_session({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 })
 
+# 行情数据提取: v_xxx="..."
+_RE_QUOTE = re.compile(r'="([^"]+)"')
+# 批量行情逐行提取: 代码 + 数据
+_RE_QUOTE_LINE = re.compile(r'v_(\w+)="([^"]*)"')
+
 
 class TencentProvider(DataProvider):
     """腾讯财经数据源 (L3 - 备用)"""
 
     PRIORITY = 3
     NAME = "tencent"
-    CAPABILITIES = {"realtime_price", "kline_data"}
+    CAPABILITIES = {"realtime_price", "realtime_batch", "kline_data"}
 
     def _http_get(self, url: str, timeout: int = 5) -> Optional[requests.Response]:
         """统一的 HTTP GET 请求"""
@@ -70,19 +74,69 @@ class TencentProvider(DataProvider):
             self.record_failure()
             return None
 
-        try:
-            # 解析返回数据: v_r_sh600000="1~浦发银行~600000~10.50~..."
-            text = response.text
-            match = re.search(r'="([^"]+)"', text)
-            if not match:
-                logger.warning(f"[腾讯] 数据格式异常 | 股票: {symbol}")
-                self.record_failure()
-                return None
+        # 解析返回数据: v_r_sh600000="1~浦发银行~600000~10.50~..."
+        match = _RE_QUOTE.search(response.text)
+        if not match:
+            logger.warning(f"[腾讯] 数据格式异常 | 股票: {symbol}")
+            self.record_failure()
+            return None
+
+        stock_data = self._parse_quote(symbol, match.group(1))
+        if stock_data is None:
+            self.record_failure()
+            return None
+
+        self.record_success()
+        return stock_data
+
+    def get_realtime_prices_batch(self, items: List[Tuple[str, str, str]]) -> Dict[str, StockData]:
+        """
+        批量获取实时价格（一次请求返回多只股票）
 
-            data = match.group(1).split('~')
+        腾讯行情接口支持逗号分隔的多个代码:
+        https://web.sqt.gtimg.cn/q=r_sh600000,r_sz000001,r_gb_aapl
+        """
+        code_to_symbol = {}
+        for symbol, normalized_code, market in items:
+            code = f"r_{normalized_code}" if market == "cn" else f"r_gb_{normalized_code.lower()}"
+            code_to_symbol[code] = symbol
+
+        url = f"https://web.sqt.gtimg.cn/q={','.join(code_to_symbol)}"
+        response = self._http_get(url)
+        if response is None:
+            self.record_failure()
+            return {}
+
+        results = {}
+        for code, raw in _RE_QUOTE_LINE.findall(response.text):
+            symbol = code_to_symbol.get(code)
+            if symbol is None or not raw:
+                continue
+            stock_data = self._parse_quote(symbol, raw)
+            if stock_data is not None:
+                results[symbol] = stock_data
+
+        if results:
+            self.record_success()
+        else:
+            self.record_failure()
+        return results
+
+    def _parse_quote(self, symbol: str, raw: str) -> Optional[StockData]:
+        """
+        解析单只股票的行情字符串
+
+        Args:
+            symbol: 原始股票代码
+            raw: 引号内的行情字段，~ 分隔
+
+        Returns:
+            StockData 或 None（字段不足、价格无效）
+        """
+        try:
+            data = raw.split('~')
             if len(data) < 5:
                 logger.warning(f"[腾讯] 数据字段不足 | 股票: {symbol}")
-                self.record_failure()
                 return None
 
             # 腾讯格式: ~名称~代码~当前价格~昨收~今开~...
@@ -91,10 +145,8 @@ class TencentProvider(DataProvider):
 
             if current_price is None or current_price <= 0:
                 logger.warning(f"[腾讯] 价格无效 | 股票: {symbol} | 价格: {current_price}")
-                self.record_failure()
                 return None
 
-            self.record_success()
             return StockData(
                 symbol=symbol,
                 name=name,
@@ -108,7 +160,6 @@ class TencentProvider(DataProvider):
 
         except (ValueError, IndexError) as e:
             logger.error(f"[腾讯] 数据解析异常 | 股票: {symbol} | 错误: {e}")
-            self.record_failure()
             return None
 
     def get_kline_data(self, symbol: str, normalized_code: str, market: str,
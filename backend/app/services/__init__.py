@@ -1,14 +1,19 @@
 """业务逻辑服务层 - 多数据源支持 + 智能缓存 + 交易时间判断"""
-import json
+import orjson
+import math
 import re
 import logging
 import time
 import threading
+import numpy as np
+from functools import lru_cache
+from itertools import islice
 from typing import Optional, Dict, Tuple, List, TYPE_CHECKING
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from ..schemas import StockWithStatus
 from ..models import Stock
-from datetime import datetime, date, timezone, timedelta
+from sqlalchemy.orm import joinedload
+from datetime import datetime, date, timezone, timedelta, time as dt_time
 from zoneinfo import ZoneInfo
 from cachetools import TTLCache
 
@@ -17,6 +22,7 @@ from ..providers import get_coordinator
 
 # 导入信号生成服务
 from .signals import generate_signal
+from .indicators import closes_frame
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -29,9 +35,34 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+# ============ 时区与交易时段 ============
+BEIJING_TZ = ZoneInfo("Asia/Shanghai")
+EASTERN_TZ = ZoneInfo("America/New_York")
+
+# A股交易时段：9:30-11:30, 13:00-15:00（北京时间）
+CN_MORNING_START = dt_time(9, 30)
+CN_MORNING_END = dt_time(11, 30)
+CN_AFTERNOON_START = dt_time(13, 0)
+CN_AFTERNOON_END = dt_time(15, 0)
+
+# 美股交易时段：9:30-16:00（美东时间）
+US_TRADING_START = dt_time(9, 30)
+US_TRADING_END = dt_time(16, 0)
+
+# 交易时段的当日秒数表示（判断时只做整数比较）
+_CN_MORNING_SEC = (9 * 3600 + 30 * 60, 11 * 3600 + 30 * 60)
+_CN_AFTERNOON_SEC = (13 * 3600, 15 * 3600)
+_US_SESSION_SEC = (9 * 3600 + 30 * 60, 16 * 3600)
+
+# 指标周期数字提取（如 "MA20" -> "20"）
+_RE_DIGITS = re.compile(r'\d+')
+
 # ============ 缓存配置 ============
-# K线数据缓存：10分钟有效，最多缓存 100 只股票
-kline_cache = TTLCache(maxsize=100, ttl=600)
+# K线数据缓存：10分钟有效，最多缓存 1000 只股票（需覆盖整批富化的股票数，否则批内互相淘汰）
+# 键为 (股票代码, 日期)，值为 (请求窗口长度, 收盘价列表)，窗口足够时可供不同 MA 周期复用
+kline_cache = TTLCache(maxsize=1000, ttl=600)
+# K线最小请求窗口
+KLINE_MIN_DATALEN = 60
 
 # 实时价格缓存：5秒有效，最多缓存 100 只股票
 price_cache = TTLCache(maxsize=100, ttl=5)
@@ -40,20 +71,38 @@ price_cache = TTLCache(maxsize=100, ttl=5)
 name_cache = TTLCache(maxsize=500, ttl=86400)
 
 # ============ 高级数据缓存 ============
-# 财报数据缓存：24小时有效，最多缓存 100 只股票
+# 财报数据缓存：24小时有效，最多缓存 100 只股票，键为 (股票代码, 报告类型, 周期)
 financial_report_cache = TTLCache(maxsize=100, ttl=86400)
 
-# 估值指标缓存：1小时有效，最多缓存 100 只股票
+# 估值指标缓存：1小时有效，最多缓存 100 只股票，键为股票代码
 valuation_cache = TTLCache(maxsize=100, ttl=3600)
 
-# 宏观指标缓存：24小时有效
+# 宏观指标缓存：24小时有效，键为 (市场, 排序后的指标元组)
 macro_cache = TTLCache(maxsize=50, ttl=86400)
 
+# ============ 报告缓存 ============
+# 每日报告缓存：60秒有效，生成快照、修改或删除股票后立即失效（其余变化最多延迟 60 秒可见）
+report_cache = TTLCache(maxsize=64, ttl=60)
+
+# 交易时段状态缓存：1秒有效，同一批次内各股票共享判断结果
+_trading_status_cache = TTLCache(maxsize=4, ttl=1)
+
+# 最近交易日收盘时间缓存：60秒有效
+_last_close_cache = TTLCache(maxsize=2, ttl=60)
+
+# 交易日判断缓存：1小时有效，键为 (日期, 市场)，刷新交易日历时清空
+_trading_day_cache = TTLCache(maxsize=4096, ttl=3600)
+
 # ============ 线程锁 ============
 # 交易日历刷新锁，防止并发刷新
 _trading_calendar_lock = threading.Lock()
 # 正在刷新的年份集合
 _refreshing_years = set()
+# 进行中的数据请求（单飞合并），键 -> Future
+_inflight_lock = threading.Lock()
+_inflight_requests: Dict[Tuple, Future] = {}
+# K线缓存读写锁（TTLCache 非线程安全；条件写入的读取-比较-写入需原子执行）
+_kline_cache_lock = threading.Lock()
 
 
 def clear_all_caches() -> Dict[str, int]:
@@ -69,6 +118,7 @@ def clear_all_caches() -> Dict[str, int]:
     financial_count = len(financial_report_cache)
     valuation_count = len(valuation_cache)
     macro_count = len(macro_cache)
+    report_count = len(report_cache)
 
     kline_cache.clear()
     price_cache.clear()
@@ -76,8 +126,9 @@ def clear_all_caches() -> Dict[str, int]:
     financial_report_cache.clear()
     valuation_cache.clear()
     macro_cache.clear()
+    report_cache.clear()
 
-    logger.info(f"[缓存清理] 已清理 K线: {kline_count}, 价格: {price_count}, 名称: {name_count}, 财报: {financial_count}, 估值: {valuation_count}, 宏观: {macro_count}")
+    logger.info("[缓存清理] 已清理 K线: %s, 价格: %s, 名称: %s, 财报: %s, 估值: %s, 宏观: %s, 报告: %s", kline_count, price_count, name_count, financial_count, valuation_count, macro_count, report_count)
 
     return {
         "kline_cache": kline_count,
@@ -85,37 +136,83 @@ def clear_all_caches() -> Dict[str, int]:
         "name_cache": name_count,
         "financial_report_cache": financial_count,
         "valuation_cache": valuation_count,
-        "macro_cache": macro_count
+        "macro_cache": macro_count,
+        "report_cache": report_count
     }
 
 
+def _get_kline_cache(cache_key: Tuple[str, date]) -> Optional[Tuple[int, List[float]]]:
+    """读取 K 线缓存（与条件写入共用锁，TTLCache 本身非线程安全）"""
+    with _kline_cache_lock:
+        return kline_cache.get(cache_key)
+
+
+def _set_kline_cache(cache_key: Tuple[str, date], datalen: int, closes: List[float]) -> None:
+    """
+    条件写入 K 线缓存：已缓存更长的窗口时不覆盖
+
+    并发请求的窗口长度可能不同，盲目覆盖会让短窗口替换掉可供更多 MA 周期复用的长窗口。
+
+    Args:
+        cache_key: 缓存键 (股票代码, 日期)
+        datalen: 本次请求的窗口长度
+        closes: 收盘价列表（非空）
+    """
+    with _kline_cache_lock:
+        cached = kline_cache.get(cache_key)
+        if cached is None or cached[0] <= datalen:
+            kline_cache[cache_key] = (datalen, closes)
+
+
+def _single_flight(key: Tuple, fetch):
+    """
+    合并同一键的并发请求：首个调用者执行 fetch，其余调用者等待并共享其结果
+
+    Args:
+        key: 请求键，如 ("realtime", symbol)
+        fetch: 无参数的实际请求函数
+
+    Returns:
+        fetch 的返回值
+    """
+    with _inflight_lock:
+        future = _inflight_requests.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight_requests[key] = future
+
+    if not is_owner:
+        return future.result()
+
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_requests.pop(key, None)
+
+
 # ============ 交易时间判断 ============
 def is_cn_trading_time() -> bool:
     """
     判断当前是否为A股交易时间（北京时间）
     A股交易时间：工作日 9:30-11:30, 13:00-15:00
     """
-    beijing_tz = ZoneInfo("Asia/Shanghai")
-    now_beijing = datetime.now(beijing_tz)
+    now_beijing = datetime.now(BEIJING_TZ)
 
     # 周末不交易（0=周一, 6=周日）
     if now_beijing.weekday() >= 5:
         return False
 
-    current_time = now_beijing.time()
-    from datetime import time as t
-
-    # 上午：9:30-11:30
-    morning_start = t(9, 30)
-    morning_end = t(11, 30)
-    # 下午：13:00-15:00
-    afternoon_start = t(13, 0)
-    afternoon_end = t(15, 0)
+    seconds = now_beijing.hour * 3600 + now_beijing.minute * 60 + now_beijing.second
 
-    is_morning = morning_start <= current_time <= morning_end
-    is_afternoon = afternoon_start <= current_time <= afternoon_end
-
-    return is_morning or is_afternoon
+    return (_CN_MORNING_SEC[0] <= seconds <= _CN_MORNING_SEC[1]
+            or _CN_AFTERNOON_SEC[0] <= seconds <= _CN_AFTERNOON_SEC[1])
 
 
 def is_us_trading_time() -> bool:
@@ -123,20 +220,14 @@ def is_us_trading_time() -> bool:
     判断当前是否为美股交易时间（美东时间）
     美股交易时间：美东时间 9:30-16:00
     """
-    eastern_tz = ZoneInfo("America/New_York")
-    now_eastern = datetime.now(eastern_tz)
+    now_eastern = datetime.now(EASTERN_TZ)
 
     # 周末不交易
     if now_eastern.weekday() >= 5:
         return False
 
-    current_time = now_eastern.time()
-    from datetime import time as t
-
-    trading_start = t(9, 30)
-    trading_end = t(16, 0)
-
-    return trading_start <= current_time <= trading_end
+    seconds = now_eastern.hour * 3600 + now_eastern.minute * 60 + now_eastern.second
+    return _US_SESSION_SEC[0] <= seconds <= _US_SESSION_SEC[1]
 
 
 def is_real_trading_time(market: str, db=None) -> bool:
@@ -173,11 +264,19 @@ def is_trading_time(market: str) -> bool:
     Returns:
         bool: 是否在交易时间内
     """
+    cached = _trading_status_cache.get(market)
+    if cached is not None:
+        return cached
+
     if market == "cn":
-        return is_cn_trading_time()
+        status = is_cn_trading_time()
     elif market == "us":
-        return is_us_trading_time()
-    return False
+        status = is_us_trading_time()
+    else:
+        status = False
+
+    _trading_status_cache[market] = status
+    return status
 
 
 # ============ 交易日历服务 ============
@@ -199,7 +298,16 @@ def parse_date_flexible(date_str) -> Optional[date]:
     """
     date_str = str(date_str).strip()
 
-    # 支持的日期格式列表
+    # 快速路径：按长度和分隔符直接切片解析，避免 strptime 的格式编译开销
+    try:
+        if len(date_str) == 8 and date_str.isdigit():
+            return date(int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8]))
+        if len(date_str) == 10 and date_str[4] in "-/" and date_str[7] == date_str[4]:
+            return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+    except ValueError:
+        pass
+
+    # 兜底：逐个尝试支持的日期格式
     formats = ["%Y-%m-%d", "%Y%m%d", "%Y/%m/%d"]
 
     for fmt in formats:
@@ -224,30 +332,22 @@ def fetch_trading_calendar_from_akshare(year: int) -> List[date]:
     """
     try:
         import akshare as ak
-        logger.info(f"[交易日历-L1] AkShare 开始获取 {year} 年交易日历...")
+        logger.info("[交易日历-L1] AkShare 开始获取 %s 年交易日历...", year)
 
         # 获取交易日历数据
         df = ak.tool_trade_date_hist_sina()
-        logger.info(f"[交易日历-L1] AkShare 返回数据条数: {len(df) if df is not None else 0}")
+        logger.info("[交易日历-L1] AkShare 返回数据条数: %s", len(df) if df is not None else 0)
 
         if df is None or df.empty:
             logger.warning(f"[交易日历-L1] AkShare 返回空数据")
             return []
 
-        # 筛选指定年份
-        year_str = str(year)
-        trading_dates = []
-
-        for date_value in df['trade_date'].tolist():
-            date_str = str(date_value)
-            # 检查年份匹配（支持多种格式）
-            if date_str.startswith(year_str) or year_str in date_str:
-                # 使用灵活的日期解析
-                date_obj = parse_date_flexible(date_str)
-                if date_obj and date_obj.year == year:
-                    trading_dates.append(date_obj)
+        # 向量化解析并筛选指定年份（统一转为字符串，兼容 date/数字/多种分隔格式）
+        import pandas as pd
+        parsed = pd.to_datetime(df['trade_date'].astype(str), errors='coerce', format='mixed')
+        trading_dates = parsed[parsed.dt.year == year].dt.date.tolist()
 
-        logger.info(f"[交易日历-L1] AkShare 获取 {year} 年交易日历成功，共 {len(trading_dates)} 个交易日")
+        logger.info("[交易日历-L1] AkShare 获取 %s 年交易日历成功，共 %s 个交易日", year, len(trading_dates))
         return trading_dates
 
     except ImportError as e:
@@ -272,7 +372,7 @@ def fetch_trading_calendar_from_exchange_calendars(year: int) -> List[date]:
     """
     try:
         import exchange_calendars as xcals
-        logger.info(f"[交易日历-L2] exchange_calendars 开始获取 {year} 年交易日历...")
+        logger.info("[交易日历-L2] exchange_calendars 开始获取 %s 年交易日历...", year)
 
         # 获取上海证券交易所日历
         xshg = xcals.get_calendar("XSHG")
@@ -284,7 +384,7 @@ def fetch_trading_calendar_from_exchange_calendars(year: int) -> List[date]:
         schedule = xshg.schedule.loc[start_date:end_date]
         trading_dates = [idx.date() for idx in schedule.index]
 
-        logger.info(f"[交易日历-L2] exchange_calendars 获取 {year} 年交易日历成功，共 {len(trading_dates)} 个交易日")
+        logger.info("[交易日历-L2] exchange_calendars 获取 %s 年交易日历成功，共 %s 个交易日", year, len(trading_dates))
         return trading_dates
 
     except ImportError as e:
@@ -343,7 +443,8 @@ def refresh_trading_calendar(db, year: int = None) -> Tuple[int, str]:
 
     # 删除旧缓存
     deleted = crud.delete_trading_calendar_by_year(db, year)
-    logger.info(f"[交易日历] 删除 {year} 年旧缓存: {deleted} 条")
+    logger.info("[交易日历] 删除 %s 年旧缓存: %s 条", year, deleted)
+    _trading_day_cache.clear()
 
     # 使用多层数据源获取交易日历
     trading_dates = get_trading_dates_with_fallback(year)
@@ -351,34 +452,56 @@ def refresh_trading_calendar(db, year: int = None) -> Tuple[int, str]:
     if not trading_dates:
         return 0, f"获取 {year} 年交易日历失败"
 
-    # 生成全年日历数据（标记交易日和非交易日）
-    from datetime import date as date_type
-
-    start_date = date_type(year, 1, 1)
-    end_date = date_type(year, 12, 31)
-
-    calendar_data = []
-    current_date = start_date
+    # 生成全年日历数据（标记交易日和非交易日，集合查找 O(1)）
+    trading_date_set = set(trading_dates)
+    start_date = date(year, 1, 1)
+    days_in_year = (date(year, 12, 31) - start_date).days + 1
 
-    while current_date <= end_date:
-        is_trading = current_date in trading_dates
-        calendar_data.append({
+    calendar_data = [
+        {
             "trade_date": current_date,
-            "is_trading_day": 1 if is_trading else 0
-        })
-        current_date += timedelta(days=1)
+            "is_trading_day": 1 if current_date in trading_date_set else 0
+        }
+        for current_date in (start_date + timedelta(days=i) for i in range(days_in_year))
+    ]
 
     # 批量保存
     created = crud.batch_create_trading_calendar(db, calendar_data)
+    _trading_day_cache.clear()
 
-    trading_count = len(trading_dates)
+    trading_count = len(trading_date_set)
     message = f"已刷新 {year} 年交易日历，共 {len(calendar_data)} 天，其中 {trading_count} 个交易日"
-    logger.info(f"[交易日历] {message}")
+    logger.info("[交易日历] %s", message)
 
     return created, message
 
 
 def is_trading_day(db=None, target_date: date = None) -> Tuple[bool, str]:
+    """
+    判断指定日期是否为交易日（按日期缓存，命中时不访问数据库）
+
+    Args:
+        db: 数据库会话（可选，如不传入则创建独立会话）
+        target_date: 目标日期，默认为今天
+
+    Returns:
+        Tuple[bool, str]: (是否为交易日, 原因说明)
+    """
+    if target_date is None:
+        target_date = date.today()
+
+    # 键中包含具体日期，跨天后自然不会命中前一天的结果
+    key = (target_date, "cn")
+    cached = _trading_day_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = _lookup_trading_day(db, target_date)
+    _trading_day_cache[key] = result
+    return result
+
+
+def _lookup_trading_day(db, target_date: date) -> Tuple[bool, str]:
     """
     判断指定日期是否为交易日（多层数据源 + 3层兜底）
 
@@ -389,7 +512,7 @@ def is_trading_day(db=None, target_date: date = None) -> Tuple[bool, str]:
 
     Args:
         db: 数据库会话（可选，如不传入则创建独立会话）
-        target_date: 目标日期，默认为今天
+        target_date: 目标日期
 
     Returns:
         Tuple[bool, str]: (是否为交易日, 原因说明)
@@ -397,9 +520,6 @@ def is_trading_day(db=None, target_date: date = None) -> Tuple[bool, str]:
     from .. import crud
     from ..database import SessionLocal
 
-    if target_date is None:
-        target_date = date.today()
-
     year = target_date.year
 
     # 【修复】使用独立的数据库会话，避免并发问题
@@ -416,7 +536,7 @@ def is_trading_day(db=None, target_date: date = None) -> Tuple[bool, str]:
                 if not crud.is_year_cached(db, year) and year not in _refreshing_years:
                     _refreshing_years.add(year)
                     try:
-                        logger.info(f"[交易日历] {year} 年缓存不存在，开始获取")
+                        logger.info("[交易日历] %s 年缓存不存在，开始获取", year)
                         refresh_trading_calendar(db, year)
                     finally:
                         _refreshing_years.discard(year)
@@ -439,7 +559,7 @@ def is_trading_day(db=None, target_date: date = None) -> Tuple[bool, str]:
             xshg = xcals.get_calendar("XSHG")
             date_str = target_date.strftime("%Y-%m-%d")
             is_session = xshg.is_session(date_str)
-            logger.info(f"[交易日历-L2兜底] exchange_calendars 判断 {date_str}: {'交易日' if is_session else '非交易日'}")
+            logger.info("[交易日历-L2兜底] exchange_calendars 判断 %s: %s", date_str, '交易日' if is_session else '非交易日')
             if is_session:
                 return True, "交易日（备用数据源）"
             else:
@@ -471,8 +591,6 @@ def fetch_historical_kline_data(symbol: str, target_date: date, ma_types: List[s
     Returns:
         Tuple[Optional[float], Optional[Dict]]: (收盘价, MA结果字典)
     """
-    import re
-
     if ma_types is None:
         ma_types = ["MA5"]
 
@@ -481,9 +599,9 @@ def fetch_historical_kline_data(symbol: str, target_date: date, ma_types: List[s
     # 计算 K 线数据长度（取最大 MA 周期 + 额外天数以确保覆盖目标日期）
     max_ma_period = 5  # 默认值
     for ma in ma_types:
-        match = re.search(r'\d+', ma)
-        if match:
-            max_ma_period = max(max_ma_period, int(match.group()))
+        period = _ma_period(ma)
+        if period:
+            max_ma_period = max(max_ma_period, period)
 
     # 获取足够的 K 线数据（目标日期前后各取一些）
     datalen = max_ma_period + 30  # 多取一些确保有目标日期的数据
@@ -503,14 +621,13 @@ def fetch_historical_kline_data(symbol: str, target_date: date, ma_types: List[s
             logger.warning(f"[历史K线数据] 数据为空 | 股票: {symbol}")
             return None, None
 
-        # 查找目标日期的 K 线数据
-        target_date_str = target_date.strftime("%Y-%m-%d")
+        # 查找目标日期的 K 线数据（day 形如 "2026-01-05" 或 "2026-01-05 15:00:00"，比较前 10 位即可）
+        target_date_str = target_date.isoformat()
         target_kline = None
         target_index = -1
 
         for i, item in enumerate(kline_data):
-            kline_date = item.get('day', '').split(' ')[0]
-            if kline_date == target_date_str:
+            if item.get('day', '')[:10] == target_date_str:
                 target_kline = item
                 target_index = i
                 break
@@ -525,21 +642,24 @@ def fetch_historical_kline_data(symbol: str, target_date: date, ma_types: List[s
             logger.warning(f"[历史K线数据] 收盘价无效 | 股票: {symbol} | 日期: {target_date}")
             return None, None
 
+        # 只取目标日期及之前最长 MA 周期内的收盘价计算前缀和（无效收盘价记为 0 并单独计数），各 MA 均为 O(1) 计算
+        ma_periods = [(ma_type, _ma_period(ma_type)) for ma_type in ma_types]
+        window = max((period for _, period in ma_periods if period), default=0)
+        start = max(0, target_index + 1 - window)
+        closes = np.array([_close_value(item) for item in kline_data[start:target_index + 1]], dtype=np.float64)
+        close_cumsum = np.concatenate(([0.0], np.cumsum(closes)))
+        invalid_cumsum = np.concatenate(([0], np.cumsum(closes <= 0)))
+        end = len(closes)
+
         # 计算各 MA 值
         ma_results = {}
-        for ma_type in ma_types:
-            match = re.search(r'\d+', ma_type)
-            if not match:
+        for ma_type, ma_period in ma_periods:
+            if ma_period is None:
                 continue
-            ma_period = int(match.group())
-
-            # 计算该日期的 MA（使用目标日期及之前的收盘价）
-            closes = []
-            for j in range(max(0, target_index - ma_period + 1), target_index + 1):
-                closes.append(float(kline_data[j].get('close', 0)))
 
-            if len(closes) >= ma_period and all(c > 0 for c in closes):
-                ma_val = round(sum(closes) / ma_period, 2)
+            # 窗口内数据充足且没有无效收盘价时才计算
+            if end >= ma_period and invalid_cumsum[end] == invalid_cumsum[end - ma_period]:
+                ma_val = round(float(close_cumsum[end] - close_cumsum[end - ma_period]) / ma_period, 2)
                 diff = close_price - ma_val
                 ma_results[ma_type] = {
                     "ma_price": ma_val,
@@ -547,9 +667,9 @@ def fetch_historical_kline_data(symbol: str, target_date: date, ma_types: List[s
                     "price_difference": round(diff, 2),
                     "price_difference_percent": round((diff / ma_val) * 100, 2) if ma_val > 0 else 0
                 }
-                logger.debug(f"[历史K线数据] {ma_type}: {ma_val} | 收盘价: {close_price} | 股票: {symbol}")
+                logger.debug("[历史K线数据] %s: %s | 收盘价: %s | 股票: %s", ma_type, ma_val, close_price, symbol)
 
-        logger.info(f"[历史K线数据] 获取成功 | 股票: {symbol} | 日期: {target_date} | 数据源: {provider_name} | 收盘价: {close_price} | MA数量: {len(ma_results)}")
+        logger.debug("[历史K线数据] 获取成功 | 股票: %s | 日期: %s | 数据源: %s | 收盘价: %s | MA数量: %s", symbol, target_date, provider_name, close_price, len(ma_results))
 
         return close_price, ma_results
 
@@ -561,14 +681,16 @@ def fetch_historical_kline_data(symbol: str, target_date: date, ma_types: List[s
 def get_last_trading_day_close() -> datetime:
     """
     获取最近一个交易日的收盘时间（北京时间）
-    用于判断缓存数据是否已经是最新的收盘数据
+    用于判断缓存数据是否已经是最新的收盘数据（结果缓存 60 秒）
     """
-    beijing_tz = ZoneInfo("Asia/Shanghai")
-    now_beijing = datetime.now(beijing_tz)
+    cached = _last_close_cache.get("cn")
+    if cached is not None:
+        return cached
+
+    now_beijing = datetime.now(BEIJING_TZ)
 
     # 当前时间在15:00之前，最近收盘日是昨天或更早
-    from datetime import time as t
-    if now_beijing.time() < t(15, 0):
+    if now_beijing.time() < CN_AFTERNOON_END:
         # 回退到前一天
         now_beijing = now_beijing - timedelta(days=1)
 
@@ -577,7 +699,24 @@ def get_last_trading_day_close() -> datetime:
         now_beijing = now_beijing - timedelta(days=1)
 
     # 返回当天15:00（收盘时间）
-    return now_beijing.replace(hour=15, minute=0, second=0, microsecond=0)
+    last_close_time = now_beijing.replace(hour=15, minute=0, second=0, microsecond=0)
+    _last_close_cache["cn"] = last_close_time
+    return last_close_time
+
+
+def get_last_trading_day_close_utc() -> datetime:
+    """
+    获取最近一个交易日的收盘时间（UTC）
+
+    与 Stock.updated_at_utc 同为 UTC 时区，比较时无需逐次换算时区
+    """
+    cached = _last_close_cache.get("utc")
+    if cached is not None:
+        return cached
+
+    last_close_utc = get_last_trading_day_close().astimezone(timezone.utc)
+    _last_close_cache["utc"] = last_close_utc
+    return last_close_utc
 
 
 def should_refresh_price(stock: Stock, market: str, db = None, need_calc: bool = False) -> Tuple[bool, str]:
@@ -613,53 +752,50 @@ def should_refresh_price(stock: Stock, market: str, db = None, need_calc: bool =
     if stock.current_price is None:
         return True, "当前价格为空，需要获取"
 
-    # 检查数据是否已是最新的收盘数据
-    if stock.updated_at is None:
+    # 检查数据是否已是最新的收盘数据（时区感知的更新时间）
+    last_update = stock.updated_at_utc
+    if last_update is None:
         return True, "更新时间为空，需要获取"
 
-    # 确保 stock.updated_at 是 timezone-aware
-    beijing_tz = ZoneInfo("Asia/Shanghai")
-    if stock.updated_at.tzinfo is None:
-        # 假设数据库存储的是 UTC 时间
-        last_update = stock.updated_at.replace(tzinfo=timezone.utc)
-    else:
-        last_update = stock.updated_at
-
-    # 获取最近交易日收盘时间
-    last_close_time = get_last_trading_day_close()
+    # 获取最近交易日收盘时间（UTC，与更新时间同时区直接比较）
+    last_close_time = get_last_trading_day_close_utc()
 
     # 如果更新时间早于最近收盘时间，需要刷新
-    if last_update.astimezone(beijing_tz) < last_close_time:
-        return True, f"数据过期，上次更新: {last_update.astimezone(beijing_tz).strftime('%Y-%m-%d %H:%M')}"
+    if last_update < last_close_time:
+        return True, f"数据过期，上次更新: {last_update.astimezone(BEIJING_TZ).strftime('%Y-%m-%d %H:%M')}"
+
+    return False, f"数据已是最新收盘数据，更新于: {last_update.astimezone(BEIJING_TZ).strftime('%Y-%m-%d %H:%M')}"
+
 
-    return False, f"数据已是最新收盘数据，更新于: {last_update.astimezone(beijing_tz).strftime('%Y-%m-%d %H:%M')}"
+# A股 6 位代码首位 -> 交易所前缀（92 开头为北交所，需优先于其他 9 开头判断）
+_CN_PREFIX_BY_FIRST_DIGIT = {
+    '4': 'bj', '8': 'bj',   # 北交所
+    '6': 'sh', '9': 'sh',   # 上交所（含其他 9 开头，如科创板CDR）
+    '0': 'sz', '3': 'sz',   # 深交所
+}
+# 带后缀代码（如 600000.SS）的市场后缀 -> 交易所前缀
+_CN_PREFIX_BY_SUFFIX = {'ss': 'sh', 'sh': 'sh', 'sz': 'sz', 'bj': 'bj'}
 
 
+@lru_cache(maxsize=4096)
 def normalize_symbol_for_sina(symbol: str) -> Tuple[str, str]:
-    """为新浪接口规范化代码并识别市场类型 (cn/us)"""
+    """为新浪接口规范化代码并识别市场类型 (cn/us)（按代码缓存）"""
     symbol = symbol.strip().upper()
-    if not symbol.isdigit() and "." not in symbol:
-        return symbol, "us"
     if "." in symbol:
         parts = symbol.split(".")
-        code, market = parts[0], parts[1].lower()
-        if market in ["ss", "sh"]: return f"sh{code}", "cn"
-        if market == "sz": return f"sz{code}", "cn"
-        if market == "bj": return f"bj{code}", "cn"
+        prefix = _CN_PREFIX_BY_SUFFIX.get(parts[1].lower())
+        if prefix:
+            return f"{prefix}{parts[0]}", "cn"
         return symbol, "us"
-    if len(symbol) == 6:
-        # 北交所：4/8/92 开头（92开头需优先于其他9开头判断）
-        if symbol.startswith(('4', '8')): return f"bj{symbol}", "cn"
-        if symbol.startswith('92'): return f"bj{symbol}", "cn"
-        # 上交所：6 开头，或其他 9 开头（如科创板CDR）
-        if symbol.startswith('6'): return f"sh{symbol}", "cn"
-        if symbol.startswith('9'): return f"sh{symbol}", "cn"
-        # 深交所：0/3 开头
-        if symbol.startswith(('0', '3')): return f"sz{symbol}", "cn"
+    if len(symbol) == 6 and symbol.isdigit():
+        prefix = "bj" if symbol.startswith('92') else _CN_PREFIX_BY_FIRST_DIGIT.get(symbol[0])
+        if prefix:
+            return f"{prefix}{symbol}", "cn"
     return symbol, "us"
 
 
-def fetch_realtime_data(symbol: str, use_cache: bool = True, is_trading_time: bool = False) -> Tuple[Optional[float], Optional[str]]:
+def fetch_realtime_data(symbol: str, use_cache: bool = True, is_trading_time: bool = False,
+                        normalized: Optional[Tuple[str, str]] = None) -> Tuple[Optional[float], Optional[str]]:
     """
     获取实时价格和股票名称（使用多数据源协调器）
 
@@ -667,20 +803,25 @@ def fetch_realtime_data(symbol: str, use_cache: bool = True, is_trading_time: bo
         symbol: 股票代码
         use_cache: 是否使用缓存（非交易时间使用）
         is_trading_time: 是否在交易时间内（交易时间内不缓存价格数据）
+        normalized: 调用方已规范化的 (代码, 市场)，提供时不再重复解析
 
     Returns:
         Tuple[Optional[float], Optional[str]]: (价格, 名称)
     """
     # 交易时间内不使用缓存，确保数据实时性
     if use_cache and not is_trading_time and symbol in price_cache:
-        logger.info(f"[实时行情] 缓存命中 | 股票: {symbol}")
+        logger.debug("[实时行情] 缓存命中 | 股票: %s", symbol)
         return price_cache[symbol]
 
     # 使用数据源协调器获取数据
     coordinator = get_coordinator()
-    normalized_code, market = normalize_symbol_for_sina(symbol)
+    normalized_code, market = normalized or normalize_symbol_for_sina(symbol)
 
-    result = coordinator.get_realtime_price(symbol, normalized_code, market)
+    # 同一股票的并发请求只发起一次
+    result = _single_flight(
+        ("realtime", symbol),
+        lambda: coordinator.get_realtime_price(symbol, normalized_code, market)
+    )
 
     if result.success and result.data:
         price = result.data.current_price
@@ -689,20 +830,86 @@ def fetch_realtime_data(symbol: str, use_cache: bool = True, is_trading_time: bo
         # 非交易时间缓存数据
         if not is_trading_time:
             price_cache[symbol] = (price, name)
+        # 名称极少变化，任何一次成功获取都写入名称缓存
+        if name:
+            name_cache[symbol] = name
 
-        logger.info(f"[实时行情] 获取成功 | 股票: {symbol} | 数据源: {result.provider_name} | 名称: {name} | 价格: {price}")
+        logger.debug("[实时行情] 获取成功 | 股票: %s | 数据源: %s | 名称: %s | 价格: %s", symbol, result.provider_name, name, price)
         return price, name
 
     logger.warning(f"[实时行情] 获取失败 | 股票: {symbol} | 尝试过: {result.tried_providers}")
     return None, None
 
 
+def fetch_realtime_prices_batch(items: List[Tuple[str, str, str]],
+                                is_trading_time: bool = False) -> Dict[str, float]:
+    """
+    批量获取实时价格（多只股票合并为少量 HTTP 请求）
+
+    Args:
+        items: [(股票代码, 规范化代码, 市场类型), ...]
+        is_trading_time: 是否在交易时间内（交易时间内不缓存价格数据）
+
+    Returns:
+        Dict[str, float]: 股票代码 -> 价格，未获取到的股票不包含在结果中
+    """
+    if not items:
+        return {}
+
+    quotes = get_coordinator().get_realtime_prices_batch(items)
+
+    prices = {}
+    for symbol, data in quotes.items():
+        prices[symbol] = data.current_price
+        if not is_trading_time:
+            price_cache[symbol] = (data.current_price, data.name)
+        if data.name:
+            name_cache[symbol] = data.name
+
+    logger.info("[实时行情] 批量获取 | 请求: %s | 成功: %s", len(items), len(prices))
+    return prices
+
+
 def fetch_stock_name(symbol: str) -> Optional[str]:
-    """获取股票中文名称"""
-    _, name = fetch_realtime_data(symbol)
+    """获取股票中文名称（优先使用名称缓存）"""
+    name = name_cache.get(symbol)
+    if name is None:
+        _, name = fetch_realtime_data(symbol)
     return name
 
 
+def _close_value(item: Dict) -> float:
+    """解析 K 线收盘价，缺失、无法解析或非有限值记为 0（按无效收盘价处理）"""
+    try:
+        value = float(item.get('close', 0))
+    except (TypeError, ValueError):
+        return 0.0
+    return value if math.isfinite(value) else 0.0
+
+
+@lru_cache(maxsize=256)
+def _ma_period(ma_type: str) -> Optional[int]:
+    """提取指标周期数字（如 "MA20" -> 20），指标种类很少，结果按字符串缓存"""
+    match = _RE_DIGITS.search(ma_type)
+    return int(match.group()) if match else None
+
+
+@lru_cache(maxsize=1024)
+def parse_ma_types(ma_types: Optional[str]) -> Tuple[str, ...]:
+    """
+    解析逗号分隔的指标字符串（按字符串缓存，相同配置只解析一次）
+
+    Args:
+        ma_types: 指标字符串，如 "MA5,MA20"
+
+    Returns:
+        Tuple[str, ...]: 过滤空值后的指标元组
+    """
+    if not ma_types:
+        return ()
+    return tuple(ma.strip() for ma in ma_types.split(",") if ma.strip())
+
+
 def get_stock_chart_urls(symbol: str) -> Dict[str, str]:
     """获取股票趋势图 URL (新浪财经 GIF)"""
     code, market = normalize_symbol_for_sina(symbol)
@@ -725,7 +932,7 @@ def get_stock_chart_urls(symbol: str) -> Dict[str, str]:
             "monthly": f"{base_url}/monthly/{us_code}.gif"
         }
 
-    logger.info(f"[新浪趋势图] 生成URL | 股票: {symbol} | 图表类型: 分时/日K/周K/月K")
+    logger.debug("[新浪趋势图] 生成URL | 股票: %s | 图表类型: 分时/日K/周K/月K", symbol)
     return urls
 
 
@@ -741,10 +948,10 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
     Returns:
         StockWithStatus: 包含 is_realtime 字段，标识数据是否为实时获取
     """
-    from ..schemas import MAResult
+    from ..schemas import MAResult, SignalBase
 
-    # 获取市场类型
-    _, market = normalize_symbol_for_sina(stock.symbol)
+    # 获取规范化代码和市场类型（整个富化过程只解析一次）
+    normalized_code, market = stock.sina_code, stock.market
 
     # 智能缓存决策：判断是否需要获取数据
     need_fetch_data = False
@@ -764,14 +971,11 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
             # 只有在真正的交易时间内才标记为实时（交易日 + 交易时间段）
             is_realtime = is_real_trading_time(market, db=db)
 
-    logger.info(f"[数据富化] 开始处理 | 股票: {stock.symbol} ({stock.name}) | 指标: {stock.ma_types} | 实时模式: {is_realtime} | 获取数据: {need_fetch_data} | 原因: {refresh_reason}")
-    enrich_start = time.time()
+    logger.debug("[数据富化] 开始处理 | 股票: %s (%s) | 指标: %s | 实时模式: %s | 获取数据: %s | 原因: %s", stock.symbol, stock.name, stock.ma_types, is_realtime, need_fetch_data, refresh_reason)
+    enrich_start = time.monotonic()
 
     # 解析 ma_types，过滤无效值
-    if stock.ma_types and stock.ma_types.strip():
-        ma_types_list = [ma.strip() for ma in stock.ma_types.split(",") if ma.strip()]
-    else:
-        ma_types_list = []
+    ma_types_list = list(parse_ma_types(stock.ma_types))
 
     # 如果没有有效的 ma_types，使用默认值
     if not ma_types_list:
@@ -784,9 +988,9 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
     if need_fetch_data:
         # 【获取数据模式】请求 API 获取最新数据
         # 交易时间内不缓存，确保数据实时性
-        current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime)
+        current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime, normalized=(normalized_code, market))
         # 记录数据获取时间
-        data_fetched_at = datetime.now(ZoneInfo("Asia/Shanghai"))
+        data_fetched_at = datetime.now(BEIJING_TZ)
     else:
         # 【缓存模式】使用数据库中已有的价格
         current_price = stock.current_price
@@ -796,43 +1000,46 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
         # 【修复】如果缓存价格为 None 或 0，强制重新获取
         if current_price is None or current_price <= 0:
             logger.warning(f"[智能缓存] 缓存价格无效，强制刷新 | 股票: {stock.symbol} | 缓存价格: {current_price}")
-            current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime)
+            current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime, normalized=(normalized_code, market))
             # 只有在真正的交易时间内才标记为实时（交易日 + 交易时间段）
             is_realtime = is_real_trading_time(market, db=db)
             # 重新获取数据后，更新获取时间
-            data_fetched_at = datetime.now(ZoneInfo("Asia/Shanghai"))
+            data_fetched_at = datetime.now(BEIJING_TZ)
         else:
-            logger.info(f"[智能缓存] 使用缓存数据 | 股票: {stock.symbol} | 价格: {current_price}")
+            logger.debug("[智能缓存] 使用缓存数据 | 股票: %s | 价格: %s", stock.symbol, current_price)
 
     # 【优化2】一次获取足够多的 K 线数据（取最大周期），避免每个 MA 类型重复请求
     # 安全提取 MA 周期数字
-    ma_periods = []
+    ma_period_map = {}
     for ma in ma_types_list:
-        match = re.search(r'\d+', ma)
-        if match:
-            ma_periods.append(int(match.group()))
+        period = _ma_period(ma)
+        if period is not None:
+            ma_period_map[ma] = period
         else:
             logger.warning(f"[数据富化] 无效的指标格式: {ma} | 股票: {stock.symbol}")
 
     # 如果没有有效的周期，使用默认值 5
-    max_ma_period = max(ma_periods) if ma_periods else 5
+    max_ma_period = max(ma_period_map.values()) if ma_period_map else 5
 
-    normalized_code, _ = normalize_symbol_for_sina(stock.symbol)
     kline_closes = None
 
-    # K线缓存键：股票代码:日期:最大周期（确保不同指标组合使用独立缓存）
-    cache_key = f"{stock.symbol}:{date.today()}:{max_ma_period}"
+    # K线缓存键：(股票代码, 日期)（按请求窗口缓存，不同指标组合共享同一份数据）
+    cache_key = (stock.symbol, date.today())
+    # 请求窗口至少覆盖常用的 MA5/10/20/60，减少因周期不同导致的重复请求
+    datalen = max(KLINE_MIN_DATALEN, max_ma_period + 2)
 
-    # 检查 K 线缓存（仅在非实时模式下使用缓存）
-    if not is_realtime and cache_key in kline_cache:
-        logger.info(f"[K线数据] 缓存命中 | 股票: {stock.symbol} | 周期: {max_ma_period}")
-        kline_closes = kline_cache[cache_key]
+    # 检查 K 线缓存（仅在非实时模式下使用缓存，且缓存窗口需覆盖本次所需）
+    cached = None if is_realtime else _get_kline_cache(cache_key)
+    if cached is not None and cached[0] >= datalen:
+        logger.debug("[K线数据] 缓存命中 | 股票: %s | 周期: %s", stock.symbol, max_ma_period)
+        kline_closes = cached[1]
     else:
-        # 缓存未命中或实时模式，使用协调器请求 API
-        datalen = max_ma_period + 2
+        # 缓存未命中、窗口不足或实时模式，使用协调器请求 API
         coordinator = get_coordinator()
-        kline_data, provider_name, tried_providers = coordinator.get_kline_data(
-            stock.symbol, normalized_code, market, datalen
+        # 同一股票同一窗口的并发请求只发起一次
+        kline_data, provider_name, tried_providers = _single_flight(
+            ("kline", cache_key, datalen),
+            lambda: coordinator.get_kline_data(stock.symbol, normalized_code, market, datalen)
         )
 
         if kline_data:
@@ -852,52 +1059,54 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
                 # 非交易时间：只用历史 K 线收盘价
                 if is_realtime and current_price is not None and current_price > 0:
                     kline_closes.append(current_price)
-                    logger.info(f"[MA计算] 交易时间内，实时价格加入MA计算 | 股票: {stock.symbol} | 实时价格: {current_price}")
+                    logger.debug("[MA计算] 交易时间内，实时价格加入MA计算 | 股票: %s | 实时价格: %s", stock.symbol, current_price)
 
                 # 存入缓存（仅当有有效数据且非实时模式时）
                 if kline_closes and not is_realtime:
-                    kline_cache[cache_key] = kline_closes
-                logger.info(f"[K线数据] 获取成功 | 股票: {stock.symbol} | 数据源: {provider_name} | K线数量: {len(kline_closes)}")
+                    _set_kline_cache(cache_key, datalen, kline_closes)
+                logger.debug("[K线数据] 获取成功 | 股票: %s | 数据源: %s | K线数量: %s", stock.symbol, provider_name, len(kline_closes))
             except Exception as e:
                 logger.error(f"[K线数据] 解析异常 | 股票: {stock.symbol} | 错误: {e}")
 
     # 【新增】如果实时价格获取失败（停牌、退市等），使用 K 线历史数据的最后收盘价
     if current_price is None and kline_closes and len(kline_closes) > 0:
         current_price = kline_closes[-1]
-        logger.info(f"[历史数据兜底] 使用 K 线最后收盘价 | 股票: {stock.symbol} | 价格: {current_price}")
+        logger.debug("[历史数据兜底] 使用 K 线最后收盘价 | 股票: %s | 价格: %s", stock.symbol, current_price)
 
     # 【优化3】本地计算所有 MA 值（无需再次请求 API）
-    for ma_type in ma_types_list:
-        ma_period = int(re.search(r'\d+', ma_type).group())
-        res = MAResult(reached_target=False)
+    # 收盘价前缀和只计算一次，各周期 MA 由首尾差值 O(1) 得出
+    closes_arr = np.asarray(kline_closes, dtype=np.float64) if kline_closes else None
+    close_cumsum = None
+    if current_price is not None and closes_arr is not None:
+        close_cumsum = np.concatenate(([0.0], np.cumsum(closes_arr)))
 
-        if current_price is not None and kline_closes and len(kline_closes) >= ma_period:
-            final_closes = kline_closes[-ma_period:]
-            # 【安全检查】过滤掉可能的 None 值
-            final_closes = [c for c in final_closes if c is not None]
+    for ma_type in ma_types_list:
+        ma_period = ma_period_map.get(ma_type)
+        if ma_period is None:
+            continue
+        res = MAResult.model_construct(reached_target=False)
 
-            if len(final_closes) >= ma_period:
-                ma_val = round(sum(final_closes) / ma_period, 2)
-            else:
-                ma_val = None
+        if close_cumsum is not None and len(kline_closes) >= ma_period:
+            ma_val = round(float(close_cumsum[-1] - close_cumsum[-1 - ma_period]) / ma_period, 2)
 
-            if ma_val is not None and ma_val > 0:
+            if ma_val > 0:
                 diff = current_price - ma_val
-                res = MAResult(
+                res = MAResult.model_construct(
                     ma_price=ma_val,
                     reached_target=current_price >= ma_val,
                     price_difference=round(diff, 2),
                     price_difference_percent=round((diff / ma_val) * 100, 2)
                 )
                 status = "✅达标" if res.reached_target else "⏳未达"
-                logger.debug(f"[MA计算] {ma_type}: {ma_val} | 当前价: {current_price} | 偏离: {diff:.2f} ({res.price_difference_percent:.2f}%) | {status}")
+                logger.debug("[MA计算] %s: %s | 当前价: %s | 偏离: %.2f (%.2f%%) | %s", ma_type, ma_val, current_price, diff, res.price_difference_percent, status)
 
         ma_results[ma_type] = res
 
-    # 汇总日志
-    enrich_elapsed = (time.time() - enrich_start) * 1000
-    reached_count = sum(1 for r in ma_results.values() if r.reached_target)
-    logger.info(f"[数据富化] 处理完成 | 股票: {stock.symbol} | 当前价: {current_price} | 达标: {reached_count}/{len(ma_types_list)} | 实时: {is_realtime} | 总耗时: {enrich_elapsed:.0f}ms")
+    # 汇总日志（达标统计仅用于日志，DEBUG 关闭时跳过）
+    if logger.isEnabledFor(logging.DEBUG):
+        enrich_elapsed = (time.monotonic() - enrich_start) * 1000
+        reached_count = sum(1 for r in ma_results.values() if r.reached_target)
+        logger.debug("[数据富化] 处理完成 | 股票: %s | 当前价: %s | 达标: %s/%s | 实时: %s | 总耗时: %.0fms", stock.symbol, current_price, reached_count, len(ma_types_list), is_realtime, enrich_elapsed)
 
     # 为了兼容前端或作为汇总展示，取第一个指标的结果作为汇总字段
     first_ma = ma_types_list[0] if ma_types_list else "MA5"
@@ -907,16 +1116,8 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
     signal_data = None
     if kline_closes and len(kline_closes) >= 20:
         try:
-            import pandas as pd
-            # 构建 DataFrame 用于信号计算
-            kline_df = pd.DataFrame({
-                'open': kline_closes,
-                'high': kline_closes,
-                'low': kline_closes,
-                'close': kline_closes,
-                'volume': [0] * len(kline_closes)
-            })
-            signal_result = generate_signal(kline_df, current_price)
+            # 构建 DataFrame 用于信号计算（开高低收共用收盘价数组）
+            signal_result = generate_signal(closes_frame(closes_arr), current_price)
             # 只保留前端需要的字段
             signal_data = {
                 'signal_type': signal_result['signal_type'],
@@ -927,11 +1128,12 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
                 'triggers': signal_result.get('triggers', []),
                 'message': signal_result.get('message', '')
             }
-            logger.debug(f"[信号生成] 股票: {stock.symbol} | 信号: {signal_result['signal_type']} | 强度: {signal_result['strength']}")
+            logger.debug("[信号生成] 股票: %s | 信号: %s | 强度: %s", stock.symbol, signal_result['signal_type'], signal_result['strength'])
         except Exception as e:
             logger.warning(f"[信号生成] 失败 | 股票: {stock.symbol} | 错误: {e}")
 
-    return StockWithStatus(
+    # 各字段均来自数据库或本地计算，类型可信，跳过 pydantic 校验直接构建
+    return StockWithStatus.model_construct(
         id=stock.id,
         symbol=stock.symbol,
         name=stock.name,
@@ -948,7 +1150,7 @@ def enrich_stock_with_status(stock: Stock, force_refresh: bool = False, db = Non
         price_difference_percent=main_res.price_difference_percent if main_res else None,
         is_realtime=is_realtime,
         data_fetched_at=data_fetched_at,
-        signal=signal_data
+        signal=SignalBase.model_construct(**signal_data) if signal_data else None
     )
 
 
@@ -957,7 +1159,7 @@ def enrich_stocks_batch(stocks: List[Stock], force_refresh: bool = False, max_wo
     并发富化多只股票的状态信息
 
     Args:
-        stocks: 股票对象列表
+        stocks: 股票对象列表（调用方应使用 joinedload(Stock.groups) 预加载分组，否则逐只懒加载）
         force_refresh: 是否强制刷新（绕过缓存）
         max_workers: 最大并发线程数，默认10
         db: 数据库会话（用于交易日判断）
@@ -969,8 +1171,11 @@ def enrich_stocks_batch(stocks: List[Stock], force_refresh: bool = False, max_wo
     if not stocks:
         return []
 
-    batch_start = time.time()
-    logger.info(f"[批量富化] 开始处理 {len(stocks)} 只股票 | 并发数: {max_workers} | 强制刷新: {force_refresh} | 需要计算: {need_calc}")
+    # 线程数不超过股票数，避免小批量时创建空闲线程
+    max_workers = min(max_workers, len(stocks))
+
+    batch_start = time.monotonic()
+    logger.info("[批量富化] 开始处理 %s 只股票 | 并发数: %s | 强制刷新: %s | 需要计算: %s", len(stocks), max_workers, force_refresh, need_calc)
 
     # ========== 线程安全修复：在主线程中预先计算所有需要 db 的数据 ==========
     # 1. 预先计算每个市场的交易日状态（避免子线程访问 db）
@@ -983,59 +1188,78 @@ def enrich_stocks_batch(stocks: List[Stock], force_refresh: bool = False, max_wo
             trading_day_cache[market] = (True, "美股或无数据库连接")
         # 预计算是否为真正的交易时间（交易日 + 交易时间段）
         realtime_cache[market] = is_real_trading_time(market, db=db)
+    # 最近交易日收盘时间对整批股票相同，只计算一次（UTC）
+    last_close_time = get_last_trading_day_close_utc()
 
-    # 2. 预加载所有股票的 groups 数据（避免子线程懒加载 relationship）
+    # 2. 按股票代码去重（同一代码只请求一次，结果回填到所有出现位置）
+    symbol_indices = {}
+    for i, stock in enumerate(stocks):
+        symbol_indices.setdefault(stock.symbol, []).append(i)
+
+    # 3. 预加载待处理股票的 groups 数据（避免子线程懒加载 relationship），
+    #    并在主线程中为每只股票做一次刷新决策，预取和子线程富化共用同一结果
     stocks_data = []
-    for stock in stocks:
+    for indices in symbol_indices.values():
+        stock = stocks[indices[0]]
+        if force_refresh:
+            refresh_decision = (True, "强制刷新")
+        else:
+            refresh_decision = _should_refresh_price_threadsafe(
+                stock, stock.market, need_calc, trading_day_cache, last_close_time
+            )
         stocks_data.append({
             'stock': stock,
             'group_ids': [g.id for g in stock.groups] if stock.groups else [],
             'group_names': [g.name for g in stock.groups] if stock.groups else [],
+            'refresh_decision': refresh_decision,
         })
 
+    # 4. 批量预取需要刷新的股票价格（合并为少量 HTTP 请求，子线程中查表即可）
+    fetch_items = {"cn": [], "us": []}
+    for data in stocks_data:
+        stock = data['stock']
+        market = stock.market
+        if (data['refresh_decision'][0]
+                or stock.current_price is None or stock.current_price <= 0):
+            fetch_items[market].append((stock.symbol, stock.sina_code, market))
+    prefetched_prices = {}
+    for market, items in fetch_items.items():
+        prefetched_prices.update(fetch_realtime_prices_batch(items, is_trading_time=realtime_cache[market]))
+
     results = [None] * len(stocks)  # 预分配结果列表，保持顺序
 
-    def process_stock(index, stock_data):
-        """处理单只股票并返回带索引的结果（线程安全版本）"""
+    def process_stock(stock_data):
+        """处理单只股票并返回结果，失败返回 None（线程安全版本）"""
         try:
-            stock = stock_data['stock']
-            result = _enrich_stock_with_status_threadsafe(
-                stock=stock,
+            return _enrich_stock_with_status_threadsafe(
+                stock=stock_data['stock'],
                 group_ids=stock_data['group_ids'],
                 group_names=stock_data['group_names'],
                 force_refresh=force_refresh,
                 need_calc=need_calc,
                 trading_day_cache=trading_day_cache,
-                realtime_cache=realtime_cache
+                realtime_cache=realtime_cache,
+                last_close_time=last_close_time,
+                prefetched_prices=prefetched_prices,
+                refresh_decision=stock_data['refresh_decision']
             )
-            return (index, result)
         except Exception as e:
             import traceback
             logger.error(f"[批量富化] 处理失败 | 股票: {stock_data['stock'].symbol} | 错误: {e}\n{traceback.format_exc()}")
-            return (index, None)
+            return None
 
-    # 使用线程池并发处理
+    # 使用线程池并发处理（map 按提交顺序返回结果，无需索引映射）
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 提交所有任务
-        futures = {
-            executor.submit(process_stock, i, stock_data): i
-            for i, stock_data in enumerate(stocks_data)
-        }
-
-        # 收集结果
-        for future in as_completed(futures):
-            try:
-                index, result = future.result()
-                if result:
-                    results[index] = result
-            except Exception as e:
-                logger.error(f"[批量富化] 任务异常 | 错误: {e}")
+        for indices, result in zip(symbol_indices.values(), executor.map(process_stock, stocks_data)):
+            if result:
+                for i in indices:
+                    results[i] = result
 
     # 过滤掉 None 结果
     valid_results = [r for r in results if r is not None]
 
-    batch_elapsed = (time.time() - batch_start) * 1000
-    logger.info(f"[批量富化] 处理完成 | 成功: {len(valid_results)}/{len(stocks)} | 总耗时: {batch_elapsed:.0f}ms | 平均: {batch_elapsed/len(stocks):.0f}ms/只")
+    batch_elapsed = (time.monotonic() - batch_start) * 1000
+    logger.info("[批量富化] 处理完成 | 成功: %s/%s | 总耗时: %.0fms | 平均: %.0fms/只", len(valid_results), len(stocks), batch_elapsed, batch_elapsed/len(stocks))
 
     return valid_results
 
@@ -1047,7 +1271,10 @@ def _enrich_stock_with_status_threadsafe(
     force_refresh: bool = False,
     need_calc: bool = False,
     trading_day_cache: dict = None,
-    realtime_cache: dict = None
+    realtime_cache: dict = None,
+    last_close_time: datetime = None,
+    prefetched_prices: Dict[str, float] = None,
+    refresh_decision: Optional[Tuple[bool, str]] = None
 ) -> StockWithStatus:
     """
     线程安全版本的 enrich_stock_with_status
@@ -1065,14 +1292,17 @@ def _enrich_stock_with_status_threadsafe(
         need_calc: 是否需要计算（新增股票/指标时为True）
         trading_day_cache: 预计算的交易日状态缓存 {"cn": (bool, str), "us": (bool, str)}
         realtime_cache: 预计算的实时状态缓存 {"cn": bool, "us": bool}
+        last_close_time: 预计算的最近交易日收盘时间（UTC）
+        prefetched_prices: 批量预取的实时价格 {symbol: price}，未命中时逐只请求
+        refresh_decision: 主线程预先做出的刷新决策 (是否刷新, 原因)，不传则在此计算
 
     Returns:
         StockWithStatus: 包含状态信息的股票对象
     """
-    from ..schemas import MAResult
+    from ..schemas import MAResult, SignalBase
 
-    # 获取市场类型
-    _, market = normalize_symbol_for_sina(stock.symbol)
+    # 获取规范化代码和市场类型（整个富化过程只解析一次）
+    normalized_code, market = stock.sina_code, stock.market
 
     # 智能缓存决策：判断是否需要获取数据（使用预计算缓存）
     need_fetch_data = False
@@ -1086,23 +1316,22 @@ def _enrich_stock_with_status_threadsafe(
         is_realtime = realtime_cache.get(market, False) if realtime_cache else False
         refresh_reason = "强制刷新"
     else:
-        # 使用预计算的交易日状态判断是否需要刷新
-        need_refresh, refresh_reason = _should_refresh_price_threadsafe(
-            stock, market, need_calc, trading_day_cache
-        )
+        # 使用预计算的交易日状态判断是否需要刷新（批量富化时复用主线程的决策）
+        if refresh_decision is None:
+            refresh_decision = _should_refresh_price_threadsafe(
+                stock, market, need_calc, trading_day_cache, last_close_time
+            )
+        need_refresh, refresh_reason = refresh_decision
         if need_refresh:
             need_fetch_data = True
             # 使用预计算的实时状态
             is_realtime = realtime_cache.get(market, False) if realtime_cache else False
 
-    logger.info(f"[数据富化] 开始处理 | 股票: {stock.symbol} ({stock.name}) | 指标: {stock.ma_types} | 实时模式: {is_realtime} | 获取数据: {need_fetch_data} | 原因: {refresh_reason}")
-    enrich_start = time.time()
+    logger.debug("[数据富化] 开始处理 | 股票: %s (%s) | 指标: %s | 实时模式: %s | 获取数据: %s | 原因: %s", stock.symbol, stock.name, stock.ma_types, is_realtime, need_fetch_data, refresh_reason)
+    enrich_start = time.monotonic()
 
     # 解析 ma_types，过滤无效值
-    if stock.ma_types and stock.ma_types.strip():
-        ma_types_list = [ma.strip() for ma in stock.ma_types.split(",") if ma.strip()]
-    else:
-        ma_types_list = []
+    ma_types_list = list(parse_ma_types(stock.ma_types))
 
     # 如果没有有效的 ma_types，使用默认值
     if not ma_types_list:
@@ -1114,10 +1343,12 @@ def _enrich_stock_with_status_threadsafe(
     # 根据智能缓存决策获取数据
     if need_fetch_data:
         # 【获取数据模式】请求 API 获取最新数据
-        # 交易时间内不缓存，确保数据实时性
-        current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime)
+        # 优先使用批量预取结果，未命中时逐只请求（交易时间内不缓存，确保数据实时性）
+        current_price = prefetched_prices.get(stock.symbol) if prefetched_prices else None
+        if current_price is None:
+            current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime, normalized=(normalized_code, market))
         # 记录数据获取时间
-        data_fetched_at = datetime.now(ZoneInfo("Asia/Shanghai"))
+        data_fetched_at = datetime.now(BEIJING_TZ)
     else:
         # 【缓存模式】使用数据库中已有的价格
         current_price = stock.current_price
@@ -1127,43 +1358,46 @@ def _enrich_stock_with_status_threadsafe(
         # 【修复】如果缓存价格为 None 或 0，强制重新获取
         if current_price is None or current_price <= 0:
             logger.warning(f"[智能缓存] 缓存价格无效，强制刷新 | 股票: {stock.symbol} | 缓存价格: {current_price}")
-            current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime)
+            current_price, _ = fetch_realtime_data(stock.symbol, use_cache=False, is_trading_time=is_realtime, normalized=(normalized_code, market))
             # 使用预计算的实时状态
             is_realtime = realtime_cache.get(market, False) if realtime_cache else False
             # 重新获取数据后，更新获取时间
-            data_fetched_at = datetime.now(ZoneInfo("Asia/Shanghai"))
+            data_fetched_at = datetime.now(BEIJING_TZ)
         else:
-            logger.info(f"[智能缓存] 使用缓存数据 | 股票: {stock.symbol} | 价格: {current_price}")
+            logger.debug("[智能缓存] 使用缓存数据 | 股票: %s | 价格: %s", stock.symbol, current_price)
 
     # 【优化2】一次获取足够多的 K 线数据（取最大周期），避免每个 MA 类型重复请求
     # 安全提取 MA 周期数字
-    ma_periods = []
+    ma_period_map = {}
     for ma in ma_types_list:
-        match = re.search(r'\d+', ma)
-        if match:
-            ma_periods.append(int(match.group()))
+        period = _ma_period(ma)
+        if period is not None:
+            ma_period_map[ma] = period
         else:
             logger.warning(f"[数据富化] 无效的指标格式: {ma} | 股票: {stock.symbol}")
 
     # 如果没有有效的周期，使用默认值 5
-    max_ma_period = max(ma_periods) if ma_periods else 5
+    max_ma_period = max(ma_period_map.values()) if ma_period_map else 5
 
-    normalized_code, _ = normalize_symbol_for_sina(stock.symbol)
     kline_closes = None
 
-    # K线缓存键：股票代码:日期:最大周期（确保不同指标组合使用独立缓存）
-    cache_key = f"{stock.symbol}:{date.today()}:{max_ma_period}"
+    # K线缓存键：(股票代码, 日期)（按请求窗口缓存，不同指标组合共享同一份数据）
+    cache_key = (stock.symbol, date.today())
+    # 请求窗口至少覆盖常用的 MA5/10/20/60，减少因周期不同导致的重复请求
+    datalen = max(KLINE_MIN_DATALEN, max_ma_period + 2)
 
-    # 检查 K 线缓存（仅在非实时模式下使用缓存）
-    if not is_realtime and cache_key in kline_cache:
-        logger.info(f"[K线数据] 缓存命中 | 股票: {stock.symbol} | 周期: {max_ma_period}")
-        kline_closes = kline_cache[cache_key]
+    # 检查 K 线缓存（仅在非实时模式下使用缓存，且缓存窗口需覆盖本次所需）
+    cached = None if is_realtime else _get_kline_cache(cache_key)
+    if cached is not None and cached[0] >= datalen:
+        logger.debug("[K线数据] 缓存命中 | 股票: %s | 周期: %s", stock.symbol, max_ma_period)
+        kline_closes = cached[1]
     else:
-        # 缓存未命中或实时模式，使用协调器请求 API
-        datalen = max_ma_period + 2
+        # 缓存未命中、窗口不足或实时模式，使用协调器请求 API
         coordinator = get_coordinator()
-        kline_data, provider_name, tried_providers = coordinator.get_kline_data(
-            stock.symbol, normalized_code, market, datalen
+        # 同一股票同一窗口的并发请求只发起一次
+        kline_data, provider_name, tried_providers = _single_flight(
+            ("kline", cache_key, datalen),
+            lambda: coordinator.get_kline_data(stock.symbol, normalized_code, market, datalen)
         )
 
         if kline_data:
@@ -1183,52 +1417,54 @@ def _enrich_stock_with_status_threadsafe(
                 # 非交易时间：只用历史 K 线收盘价
                 if is_realtime and current_price is not None and current_price > 0:
                     kline_closes.append(current_price)
-                    logger.info(f"[MA计算] 交易时间内，实时价格加入MA计算 | 股票: {stock.symbol} | 实时价格: {current_price}")
+                    logger.debug("[MA计算] 交易时间内，实时价格加入MA计算 | 股票: %s | 实时价格: %s", stock.symbol, current_price)
 
                 # 存入缓存（仅当有有效数据且非实时模式时）
                 if kline_closes and not is_realtime:
-                    kline_cache[cache_key] = kline_closes
-                logger.info(f"[K线数据] 获取成功 | 股票: {stock.symbol} | 数据源: {provider_name} | K线数量: {len(kline_closes)}")
+                    _set_kline_cache(cache_key, datalen, kline_closes)
+                logger.debug("[K线数据] 获取成功 | 股票: %s | 数据源: %s | K线数量: %s", stock.symbol, provider_name, len(kline_closes))
             except Exception as e:
                 logger.error(f"[K线数据] 解析异常 | 股票: {stock.symbol} | 错误: {e}")
 
     # 【新增】如果实时价格获取失败（停牌、退市等），使用 K 线历史数据的最后收盘价
     if current_price is None and kline_closes and len(kline_closes) > 0:
         current_price = kline_closes[-1]
-        logger.info(f"[历史数据兜底] 使用 K 线最后收盘价 | 股票: {stock.symbol} | 价格: {current_price}")
+        logger.debug("[历史数据兜底] 使用 K 线最后收盘价 | 股票: %s | 价格: %s", stock.symbol, current_price)
 
     # 【优化3】本地计算所有 MA 值（无需再次请求 API）
+    # 收盘价前缀和只计算一次，各周期 MA 由首尾差值 O(1) 得出
+    closes_arr = np.asarray(kline_closes, dtype=np.float64) if kline_closes else None
+    close_cumsum = None
+    if current_price is not None and closes_arr is not None:
+        close_cumsum = np.concatenate(([0.0], np.cumsum(closes_arr)))
+
     for ma_type in ma_types_list:
-        ma_period = int(re.search(r'\d+', ma_type).group())
-        res = MAResult(reached_target=False)
+        ma_period = ma_period_map.get(ma_type)
+        if ma_period is None:
+            continue
+        res = MAResult.model_construct(reached_target=False)
 
-        if current_price is not None and kline_closes and len(kline_closes) >= ma_period:
-            final_closes = kline_closes[-ma_period:]
-            # 【安全检查】过滤掉可能的 None 值
-            final_closes = [c for c in final_closes if c is not None]
+        if close_cumsum is not None and len(kline_closes) >= ma_period:
+            ma_val = round(float(close_cumsum[-1] - close_cumsum[-1 - ma_period]) / ma_period, 2)
 
-            if len(final_closes) >= ma_period:
-                ma_val = round(sum(final_closes) / ma_period, 2)
-            else:
-                ma_val = None
-
-            if ma_val is not None and ma_val > 0:
+            if ma_val > 0:
                 diff = current_price - ma_val
-                res = MAResult(
+                res = MAResult.model_construct(
                     ma_price=ma_val,
                     reached_target=current_price >= ma_val,
                     price_difference=round(diff, 2),
                     price_difference_percent=round((diff / ma_val) * 100, 2)
                 )
                 status = "✅达标" if res.reached_target else "⏳未达"
-                logger.debug(f"[MA计算] {ma_type}: {ma_val} | 当前价: {current_price} | 偏离: {diff:.2f} ({res.price_difference_percent:.2f}%) | {status}")
+                logger.debug("[MA计算] %s: %s | 当前价: %s | 偏离: %.2f (%.2f%%) | %s", ma_type, ma_val, current_price, diff, res.price_difference_percent, status)
 
         ma_results[ma_type] = res
 
-    # 汇总日志
-    enrich_elapsed = (time.time() - enrich_start) * 1000
-    reached_count = sum(1 for r in ma_results.values() if r.reached_target)
-    logger.info(f"[数据富化] 处理完成 | 股票: {stock.symbol} | 当前价: {current_price} | 达标: {reached_count}/{len(ma_types_list)} | 实时: {is_realtime} | 总耗时: {enrich_elapsed:.0f}ms")
+    # 汇总日志（达标统计仅用于日志，DEBUG 关闭时跳过）
+    if logger.isEnabledFor(logging.DEBUG):
+        enrich_elapsed = (time.monotonic() - enrich_start) * 1000
+        reached_count = sum(1 for r in ma_results.values() if r.reached_target)
+        logger.debug("[数据富化] 处理完成 | 股票: %s | 当前价: %s | 达标: %s/%s | 实时: %s | 总耗时: %.0fms", stock.symbol, current_price, reached_count, len(ma_types_list), is_realtime, enrich_elapsed)
 
     # 为了兼容前端或作为汇总展示，取第一个指标的结果作为汇总字段
     first_ma = ma_types_list[0] if ma_types_list else "MA5"
@@ -1238,16 +1474,8 @@ def _enrich_stock_with_status_threadsafe(
     signal_data = None
     if kline_closes and len(kline_closes) >= 20:
         try:
-            import pandas as pd
-            # 构建 DataFrame 用于信号计算
-            kline_df = pd.DataFrame({
-                'open': kline_closes,
-                'high': kline_closes,
-                'low': kline_closes,
-                'close': kline_closes,
-                'volume': [0] * len(kline_closes)
-            })
-            signal_result = generate_signal(kline_df, current_price)
+            # 构建 DataFrame 用于信号计算（开高低收共用收盘价数组）
+            signal_result = generate_signal(closes_frame(closes_arr), current_price)
             # 只保留前端需要的字段
             signal_data = {
                 'signal_type': signal_result['signal_type'],
@@ -1258,11 +1486,12 @@ def _enrich_stock_with_status_threadsafe(
                 'triggers': signal_result.get('triggers', []),
                 'message': signal_result.get('message', '')
             }
-            logger.debug(f"[信号生成] 股票: {stock.symbol} | 信号: {signal_result['signal_type']} | 强度: {signal_result['strength']}")
+            logger.debug("[信号生成] 股票: %s | 信号: %s | 强度: %s", stock.symbol, signal_result['signal_type'], signal_result['strength'])
         except Exception as e:
             logger.warning(f"[信号生成] 失败 | 股票: {stock.symbol} | 错误: {e}")
 
-    return StockWithStatus(
+    # 各字段均来自数据库或本地计算，类型可信，跳过 pydantic 校验直接构建
+    return StockWithStatus.model_construct(
         id=stock.id,
         symbol=stock.symbol,
         name=stock.name,
@@ -1279,7 +1508,7 @@ def _enrich_stock_with_status_threadsafe(
         price_difference_percent=main_res.price_difference_percent if main_res else None,
         is_realtime=is_realtime,
         data_fetched_at=data_fetched_at,
-        signal=signal_data
+        signal=SignalBase.model_construct(**signal_data) if signal_data else None
     )
 
 
@@ -1287,7 +1516,8 @@ def _should_refresh_price_threadsafe(
     stock: Stock,
     market: str,
     need_calc: bool,
-    trading_day_cache: dict = None
+    trading_day_cache: dict = None,
+    last_close_time: datetime = None
 ) -> Tuple[bool, str]:
     """
     线程安全版本的 should_refresh_price
@@ -1299,6 +1529,7 @@ def _should_refresh_price_threadsafe(
         market: 市场类型 ("cn" 或 "us")
         need_calc: 是否需要计算（新增股票/指标时为True）
         trading_day_cache: 预计算的交易日状态缓存
+        last_close_time: 预计算的最近交易日收盘时间（UTC，批量处理时只计算一次）
 
     Returns:
         Tuple[bool, str]: (是否需要刷新, 原因说明)
@@ -1323,31 +1554,25 @@ def _should_refresh_price_threadsafe(
     if stock.current_price is None:
         return True, "当前价格为空，需要获取"
 
-    # 检查数据是否已是最新的收盘数据
-    if stock.updated_at is None:
+    # 检查数据是否已是最新的收盘数据（时区感知的更新时间）
+    last_update = stock.updated_at_utc
+    if last_update is None:
         return True, "更新时间为空，需要获取"
 
-    # 确保 stock.updated_at 是 timezone-aware
-    beijing_tz = ZoneInfo("Asia/Shanghai")
-    if stock.updated_at.tzinfo is None:
-        # 假设数据库存储的是 UTC 时间
-        last_update = stock.updated_at.replace(tzinfo=timezone.utc)
-    else:
-        last_update = stock.updated_at
-
-    # 获取最近交易日收盘时间
-    last_close_time = get_last_trading_day_close()
+    # 获取最近交易日收盘时间（UTC，与更新时间同时区直接比较）
+    if last_close_time is None:
+        last_close_time = get_last_trading_day_close_utc()
 
     # 如果更新时间早于最近收盘时间，需要刷新
-    if last_update.astimezone(beijing_tz) < last_close_time:
-        return True, f"数据过期，上次更新: {last_update.astimezone(beijing_tz).strftime('%Y-%m-%d %H:%M')}"
+    if last_update < last_close_time:
+        return True, f"数据过期，上次更新: {last_update.astimezone(BEIJING_TZ).strftime('%Y-%m-%d %H:%M')}"
 
-    return False, f"数据已是最新收盘数据，更新于: {last_update.astimezone(beijing_tz).strftime('%Y-%m-%d %H:%M')}"
+    return False, f"数据已是最新收盘数据，更新于: {last_update.astimezone(BEIJING_TZ).strftime('%Y-%m-%d %H:%M')}"
 
 
 # ============ 快照和报告服务 ============
 
-def generate_daily_snapshots(db, force: bool = False, target_date: date = None) -> Tuple[int, int, str]:
+def generate_daily_snapshots(db, force: bool = False, target_date: date = None, max_workers: int = 10) -> Tuple[int, int, str]:
     """
     为所有监控的股票生成快照
 
@@ -1355,6 +1580,7 @@ def generate_daily_snapshots(db, force: bool = False, target_date: date = None)
         db: 数据库会话
         force: 是否强制刷新（即使已有快照）
         target_date: 目标日期，默认为今天。历史日期使用 K 线收盘价。
+        max_workers: 历史快照并发获取 K 线的最大线程数，默认10
 
     Returns:
         Tuple[int, int, str]: (新建数量, 更新数量, 消息)
@@ -1367,8 +1593,11 @@ def generate_daily_snapshots(db, force: bool = False, target_date: date = None)
     # 判断是否为历史日期
     is_historical = target_date < date.today()
 
-    # 获取所有股票
-    stocks = db.query(Stock).all()
+    # 获取所有股票（当天快照需经 enrich_stocks_batch 读取分组，预加载 groups 避免 N+1 查询）
+    query = db.query(Stock)
+    if not is_historical:
+        query = query.options(joinedload(Stock.groups))
+    stocks = query.all()
 
     if not stocks:
         return 0, 0, "没有监控的股票"
@@ -1377,92 +1606,120 @@ def generate_daily_snapshots(db, force: bool = False, target_date: date = None)
     updated_count = 0
     skipped_count = 0
 
+    # 一次查询获取目标日期已有快照，避免循环内逐只查询
+    existing_map = crud.get_snapshots_map(db, target_date, [s.id for s in stocks])
+
+    # 待写入的快照，循环结束后批量 upsert（一次事务）
+    rows = []
+
     if is_historical:
         # 历史日期：使用 K 线数据
-        logger.info(f"[快照生成] 生成历史快照 | 日期: {target_date} | 股票数: {len(stocks)}")
+        logger.info("[快照生成] 生成历史快照 | 日期: %s | 股票数: %s", target_date, len(stocks))
 
+        # 在主线程中筛选需要获取的股票并解析 ma_types（避免子线程访问 ORM 对象）
+        tasks = []
         for stock in stocks:
             # 检查是否已存在快照
-            existing = crud.get_snapshot(db, stock.id, target_date)
+            existing = existing_map.get(stock.id)
             if existing and not force:
                 skipped_count += 1
                 continue
 
             # 解析 ma_types
-            if stock.ma_types and stock.ma_types.strip():
-                ma_types_list = [ma.strip() for ma in stock.ma_types.split(",") if ma.strip()]
-            else:
-                ma_types_list = ["MA5"]
-
-            # 获取历史 K 线数据
-            close_price, ma_results = fetch_historical_kline_data(stock.symbol, target_date, ma_types_list)
-
-            if close_price is None or close_price <= 0:
-                logger.warning(f"[快照生成] 跳过股票 {stock.symbol}，无法获取历史数据")
-                skipped_count += 1
-                continue
-
-            # 添加数据来源标记
-            for ma_type in ma_results:
-                ma_results[ma_type]["data_source"] = "kline_close"
-
-            # 保存快照
-            crud.create_or_update_snapshot(
-                db, stock.id, target_date,
-                close_price,
-                ma_results
-            )
+            ma_types_list = list(parse_ma_types(stock.ma_types)) or ["MA5"]
+
+            tasks.append((stock.id, stock.symbol, ma_types_list, existing is not None))
+
+        # 并发获取历史 K 线数据（请求频率由数据源协调器统一限流）
+        # 有界提交：在途任务不超过 2 倍线程数，完成即释放 Future 引用，避免一次性持有全部 Future
+        workers = max(1, min(max_workers, len(tasks)))
+        pending_tasks = iter(tasks)
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for stock_id, symbol, ma_types_list, has_existing in islice(pending_tasks, 2 * workers - len(in_flight)):
+                    future = executor.submit(fetch_historical_kline_data, symbol, target_date, ma_types_list)
+                    in_flight[future] = (stock_id, symbol, has_existing)
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stock_id, symbol, has_existing = in_flight.pop(future)
+                    try:
+                        close_price, ma_results = future.result()
+                    except Exception as e:
+                        logger.error(f"[快照生成] 获取历史数据异常 | 股票: {symbol} | 错误: {e}")
+                        close_price, ma_results = None, None
+
+                    if close_price is None or close_price <= 0:
+                        logger.warning(f"[快照生成] 跳过股票 {symbol}，无法获取历史数据")
+                        skipped_count += 1
+                        continue
+
+                    # 添加数据来源标记
+                    for ma_type in ma_results:
+                        ma_results[ma_type]["data_source"] = "kline_close"
+
+                    rows.append({
+                        "stock_id": stock_id,
+                        "snapshot_date": target_date,
+                        "price": close_price,
+                        "ma_results": ma_results
+                    })
 
-            if existing:
-                updated_count += 1
-            else:
-                created_count += 1
+                    if has_existing:
+                        updated_count += 1
+                    else:
+                        created_count += 1
 
     else:
         # 当天：使用实时数据
-        logger.info(f"[快照生成] 生成今日快照 | 日期: {target_date} | 股票数: {len(stocks)}")
+        logger.info("[快照生成] 生成今日快照 | 日期: %s | 股票数: %s", target_date, len(stocks))
 
-        # 使用并发获取所有股票的实时数据
-        enriched_stocks = enrich_stocks_batch(stocks, force_refresh=True)
+        # 先剔除已有快照的股票（非强制时），避免为其拉取行情和构建结果
+        pending_stocks = stocks if force else [s for s in stocks if s.id not in existing_map]
+
+        # 使用并发获取待生成股票的实时数据
+        enriched_stocks = enrich_stocks_batch(pending_stocks, force_refresh=True) if pending_stocks else []
 
         for enriched in enriched_stocks:
             # 构建 ma_results 字典
-            ma_results = {}
-            for ma_type, result in enriched.ma_results.items():
-                ma_results[ma_type] = {
+            ma_results = {
+                ma_type: {
                     "ma_price": result.ma_price,
                     "reached_target": result.reached_target,
                     "price_difference": result.price_difference,
                     "price_difference_percent": result.price_difference_percent,
                     "data_source": "realtime"
                 }
+                for ma_type, result in enriched.ma_results.items()
+            }
 
-            # 检查是否已存在快照
-            existing = crud.get_snapshot(db, enriched.id, target_date)
-
-            if existing:
-                if force:
-                    crud.create_or_update_snapshot(
-                        db, enriched.id, target_date,
-                        enriched.current_price or 0,
-                        ma_results
-                    )
-                    updated_count += 1
+            rows.append({
+                "stock_id": enriched.id,
+                "snapshot_date": target_date,
+                "price": enriched.current_price or 0,
+                "ma_results": ma_results
+            })
+
+            if enriched.id in existing_map:
+                updated_count += 1
             else:
-                crud.create_or_update_snapshot(
-                    db, enriched.id, target_date,
-                    enriched.current_price or 0,
-                    ma_results
-                )
                 created_count += 1
 
+    # 批量保存快照
+    if crud.bulk_upsert_snapshots(db, rows):
+        # 快照已变化，报告缓存失效
+        report_cache.clear()
+
     message = f"已生成 {created_count} 个新快照"
     if updated_count > 0:
         message += f"，更新 {updated_count} 个现有快照"
     if skipped_count > 0:
         message += f"，跳过 {skipped_count} 个"
 
-    logger.info(f"[快照生成] {message} | 日期: {target_date}")
+    logger.info("[快照生成] %s | 日期: %s", message, target_date)
 
     return created_count, updated_count, message
 
@@ -1489,49 +1746,35 @@ def get_daily_report(db, target_date: date = None, page: int = 1, page_size: int
     page = max(1, page)
     page_size = min(max(1, page_size), 50)  # 最小1，最大50
 
-    # 获取目标日期快照
-    target_snapshots = crud.get_snapshots_by_date(db, target_date)
-
-    if not target_snapshots:
-        return {
-            "date": target_date,
-            "has_today": False,
-            "has_yesterday": False,
-            "summary": {
-                "total_stocks": 0,
-                "reached_count": 0,
-                "newly_reached": 0,
-                "newly_below": 0,
-                "continuous_below": 0,
-                "reached_rate": 0.0,
-                "reached_rate_change": 0.0
-            },
-            "newly_reached": [],
-            "newly_below": [],
-            "all_below_stocks": [],
-            "reached_stocks": [],
-            "total_reached": 0
-        }
+    # 检查报告缓存（快照生成后会主动失效）
+    cache_key = (target_date, page, page_size)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("[每日报告] 缓存命中 | 日期: %s | 页码: %s", target_date, page)
+        return cached
 
     # 获取前一交易日快照
     yesterday_snapshots = crud.get_previous_trading_day_snapshots(db, target_date)
 
     # 构建昨日数据索引（只保留每个股票的最新快照，即第一条记录）
+    # 同时统计昨日达标数（单次遍历）
     yesterday_data = {}
+    yesterday_reached_count = 0
     for snap in yesterday_snapshots:
         if snap.snapshot_date < target_date and snap.stock_id not in yesterday_data:
+            yesterday_ma = orjson.loads(snap.ma_results) if snap.ma_results else {}
             yesterday_data[snap.stock_id] = {
                 "date": snap.snapshot_date,
-                "ma_results": json.loads(snap.ma_results) if snap.ma_results else {}
+                "ma_results": yesterday_ma
             }
+            if snap.is_reached:
+                yesterday_reached_count += 1
+    yesterday_total = len(yesterday_data)
 
     has_yesterday = len(yesterday_data) > 0
 
-    # 获取所有股票信息
-    stocks = {s.id: s for s in db.query(Stock).all()}
-
     # 统计目标日期数据
-    total_stocks = len(target_snapshots)
+    total_stocks = 0
     reached_count = 0
     newly_reached_list = []
     newly_below_list = []
@@ -1542,49 +1785,74 @@ def get_daily_report(db, target_date: date = None, page: int = 1, page_size: int
     # ========== 新增：未达标个股聚合（含分类） ==========
     all_below_stocks_list = []  # 所有未达标股票列表
 
-    # 昨日达标率
-    yesterday_reached_count = 0
-    yesterday_total = 0
+    # 流式遍历目标日期快照，单次遍历完成计数与聚合
+    for snap in crud.get_snapshots_by_date(db, target_date):
+        total_stocks += 1
+        ma_results = orjson.loads(snap.ma_results) if snap.ma_results else {}
 
-    for snap in target_snapshots:
-        ma_results = json.loads(snap.ma_results) if snap.ma_results else {}
-
-        # 判断是否达标（任一 MA 达标即算达标）
-        is_reached = any(r.get("reached_target", False) for r in ma_results.values())
+        # 判断是否达标（任一 MA 达标即算达标，直接使用写入时计算的标记）
+        is_reached = bool(snap.is_reached)
         if is_reached:
             reached_count += 1
 
-        # ========== 收集达标指标的详细信息 ==========
-        stock = stocks.get(snap.stock_id)
-        if stock and is_reached:
-            reached_indicators = []
-            max_deviation = 0.0
-
-            for ma_type, result in ma_results.items():
-                if result.get("reached_target", False):
-                    deviation = result.get("price_difference_percent", 0)
-
-                    # 计算 reach_type：判断是新增达标还是持续达标
-                    if snap.stock_id in yesterday_data:
-                        yesterday_ma = yesterday_data[snap.stock_id]["ma_results"]
-                        yesterday_result = yesterday_ma.get(ma_type, {})
-                        yesterday_reached = yesterday_result.get("reached_target", False)
-
-                        if yesterday_reached:
-                            reach_type = "continuous_reach"  # 昨日达标 → 今日达标
-                        else:
-                            reach_type = "new_reach"  # 昨日未达标 → 今日达标
-                    else:
-                        reach_type = "new_reach"  # 无昨日数据，视为新增
+        # 股票代码与名称随快照一并查出（股票已删除时为 None，只计入统计）
+        if snap.symbol is None:
+            continue
 
+        # 昨日该股票的 MA 结果（None 表示无昨日数据），每只股票只查一次
+        yesterday_entry = yesterday_data.get(snap.stock_id)
+        yesterday_ma = yesterday_entry["ma_results"] if yesterday_entry else None
+        reached_indicators = []
+
+        # 单次遍历各 MA：同时完成达标聚合、未达标分类与昨日对比
+        for ma_type, today_result in ma_results.items():
+            today_reached = bool(today_result.get("reached_target", False))
+            yesterday_reached = (
+                bool(yesterday_ma.get(ma_type, {}).get("reached_target", False))
+                if yesterday_ma is not None else False
+            )
+
+            if today_reached:
+                # ========== 收集达标指标的详细信息 ==========
+                if is_reached:
                     reached_indicators.append({
                         "ma_type": ma_type,
-                        "ma_price": result.get("ma_price", 0),
-                        "price_difference_percent": deviation,
-                        "reach_type": reach_type
+                        "ma_price": today_result.get("ma_price", 0),
+                        "price_difference_percent": today_result.get("price_difference_percent", 0),
+                        # 昨日达标 → 今日达标为持续达标；昨日未达标或无昨日数据视为新增
+                        "reach_type": "continuous_reach" if yesterday_reached else "new_reach"
                     })
-                    max_deviation = max(max_deviation, abs(deviation))
+            else:
+                # ========== 收集所有未达标股票（含分类） ==========
+                all_below_stocks_list.append({
+                    "stock_id": snap.stock_id,
+                    "symbol": snap.symbol,
+                    "name": snap.name,
+                    "current_price": snap.price or 0,
+                    "ma_type": ma_type,
+                    "ma_price": today_result.get("ma_price", 0),
+                    "price_difference_percent": today_result.get("price_difference_percent", 0),
+                    # 昨日达标 → 今日不达标为新跌破；持续未达标或无昨日数据为持续未达标
+                    "fall_type": "new_fall" if yesterday_reached else "continuous_below"
+                })
+
+            # 对比昨日（仅有昨日数据时，用于 newly_reached 和 newly_below）
+            if yesterday_ma is not None and today_reached != yesterday_reached:
+                change = {
+                    "stock_id": snap.stock_id,
+                    "symbol": snap.symbol,
+                    "name": snap.name,
+                    "ma_type": ma_type,
+                    "current_price": snap.price,
+                    "ma_price": today_result.get("ma_price", 0),
+                    "price_difference_percent": today_result.get("price_difference_percent", 0)
+                }
+                if today_reached:
+                    newly_reached_list.append(change)  # 新增达标
+                else:
+                    newly_below_list.append(change)  # 跌破均线（状态变化）
 
+        if is_reached:
             # 保留原始符号（正/负）
             original_max_deviation = max(
                 (r["price_difference_percent"] for r in reached_indicators),
@@ -1594,81 +1862,34 @@ def get_daily_report(db, target_date: date = None, page: int = 1, page_size: int
 
             reached_stocks_map[snap.stock_id] = {
                 "stock_id": snap.stock_id,
-                "symbol": stock.symbol,
-                "name": stock.name,
+                "symbol": snap.symbol,
+                "name": snap.name,
                 "current_price": snap.price or 0,
                 "max_deviation_percent": original_max_deviation,
                 "reached_indicators": reached_indicators
             }
 
-        # ========== 新增：收集所有未达标股票（含分类） ==========
-        if stock:
-            yesterday_ma = yesterday_data.get(snap.stock_id, {}).get("ma_results", {})
-
-            for ma_type, today_result in ma_results.items():
-                today_reached = today_result.get("reached_target", False)
-
-                # 只处理未达标的 MA
-                if not today_reached:
-                    yesterday_result = yesterday_ma.get(ma_type, {})
-                    yesterday_reached = yesterday_result.get("reached_target", False)
-
-                    # 判断 fall_type
-                    if snap.stock_id in yesterday_data and yesterday_reached:
-                        fall_type = "new_fall"  # 昨日达标 → 今日不达标
-                    else:
-                        fall_type = "continuous_below"  # 持续未达标或无昨日数据
-
-                    all_below_stocks_list.append({
-                        "stock_id": snap.stock_id,
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "current_price": snap.price or 0,
-                        "ma_type": ma_type,
-                        "ma_price": today_result.get("ma_price", 0),
-                        "price_difference_percent": today_result.get("price_difference_percent", 0),
-                        "fall_type": fall_type
-                    })
-
-        # 对比昨日（保留原有逻辑用于 newly_reached 和 newly_below）
-        if stock and snap.stock_id in yesterday_data:
-            yesterday_ma = yesterday_data[snap.stock_id]["ma_results"]
-
-            for ma_type, today_result in ma_results.items():
-                today_reached = today_result.get("reached_target", False)
-                yesterday_result = yesterday_ma.get(ma_type, {})
-                yesterday_reached = yesterday_result.get("reached_target", False)
-
-                # 检测变化
-                if today_reached and not yesterday_reached:
-                    # 新增达标
-                    newly_reached_list.append({
-                        "stock_id": snap.stock_id,
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "ma_type": ma_type,
-                        "current_price": snap.price,
-                        "ma_price": today_result.get("ma_price", 0),
-                        "price_difference_percent": today_result.get("price_difference_percent", 0)
-                    })
-                elif not today_reached and yesterday_reached:
-                    # 跌破均线（状态变化）
-                    newly_below_list.append({
-                        "stock_id": snap.stock_id,
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "ma_type": ma_type,
-                        "current_price": snap.price,
-                        "ma_price": today_result.get("ma_price", 0),
-                        "price_difference_percent": today_result.get("price_difference_percent", 0)
-                    })
-
-    # 计算昨日达标率
-    if has_yesterday:
-        for snap_data in yesterday_data.values():
-            yesterday_total += 1
-            if any(r.get("reached_target", False) for r in snap_data["ma_results"].values()):
-                yesterday_reached_count += 1
+    # 目标日期无快照
+    if total_stocks == 0:
+        return {
+            "date": target_date,
+            "has_today": False,
+            "has_yesterday": False,
+            "summary": {
+                "total_stocks": 0,
+                "reached_count": 0,
+                "newly_reached": 0,
+                "newly_below": 0,
+                "continuous_below": 0,
+                "reached_rate": 0.0,
+                "reached_rate_change": 0.0
+            },
+            "newly_reached": [],
+            "newly_below": [],
+            "all_below_stocks": [],
+            "reached_stocks": [],
+            "total_reached": 0
+        }
 
     # 计算达标率变化
     today_rate = (reached_count / total_stocks * 100) if total_stocks > 0 else 0
@@ -1694,9 +1915,7 @@ def get_daily_report(db, target_date: date = None, page: int = 1, page_size: int
     # 按 MA 类型排序，然后按 fall_type（new_fall 优先），最后按偏离度（最负优先）
     def get_ma_number(item):
         """提取 MA 类型中的数字用于排序"""
-        import re
-        match = re.search(r'\d+', item.get("ma_type", "MA0"))
-        return int(match.group()) if match else 0
+        return _ma_period(item.get("ma_type", "MA0")) or 0
 
     def below_sort_key(item):
         """未达标股票排序键"""
@@ -1712,7 +1931,7 @@ def get_daily_report(db, target_date: date = None, page: int = 1, page_size: int
     # 计算持续未达标数量
     continuous_below_count = sum(1 for item in all_below_stocks_list if item.get("fall_type") == "continuous_below")
 
-    return {
+    report = {
         "date": target_date,
         "has_today": True,
         "has_yesterday": has_yesterday,
@@ -1731,3 +1950,6 @@ def get_daily_report(db, target_date: date = None, page: int = 1, page_size: int
         "reached_stocks": paginated_reached_stocks,
         "total_reached": total_reached
     }
+
+    report_cache[cache_key] = report
+    return report
@@ -7,9 +7,9 @@
 import logging
 from typing import Optional, Dict
 from datetime import datetime
-from zoneinfo import ZoneInfo
 
 from ...providers import get_coordinator
+from .. import financial_report_cache, BEIJING_TZ, _single_flight
 from ...schemas.advanced import (
     FinancialReportResponse,
     FinancialReportData,
@@ -18,6 +18,9 @@ from ...schemas.advanced import (
 
 logger = logging.getLogger(__name__)
 
+# 财报数据字段（与 FinancialReportData 保持一致）
+_FINANCIAL_FIELDS = tuple(FinancialReportData.model_fields)
+
 
 def get_financial_report(
     symbol: str,
@@ -43,20 +46,20 @@ def get_financial_report(
     Returns:
         Dict: 财报数据响应或错误响应
     """
-    from .. import financial_report_cache
-
     # 检查缓存
-    cache_key = f"{symbol}:{report_type}:{period}"
-    if use_cache and cache_key in financial_report_cache:
-        logger.info(f"[财报服务] 缓存命中 | 股票: {symbol} | 类型: {report_type}")
-        cached = financial_report_cache[cache_key]
-        cached["is_cached"] = True
-        return cached
+    cache_key = (symbol, report_type, period)
+    if use_cache:
+        cached = financial_report_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[财报服务] 缓存命中 | 股票: {symbol} | 类型: {report_type}")
+            return cached
 
     # 获取数据
     coordinator = get_coordinator()
-    data, provider_name = coordinator.get_financial_report(
-        symbol, normalized_code, market, report_type, period
+    # 同一财报的并发未命中请求合并为一次数据源调用
+    data, provider_name = _single_flight(
+        ("financial", symbol, report_type, period),
+        lambda: coordinator.get_financial_report(symbol, normalized_code, market, report_type, period)
     )
 
     if data is None:
@@ -71,26 +74,11 @@ def get_financial_report(
         }
 
     # 构建响应
-    now = datetime.now(ZoneInfo("Asia/Shanghai"))
+    now = datetime.now(BEIJING_TZ)
     report_date = data.get("report_date")
 
-    # 提取财务数据
-    financial_data = FinancialReportData(
-        total_assets=data.get("total_assets"),
-        total_liabilities=data.get("total_liabilities"),
-        total_equity=data.get("total_equity"),
-        current_assets=data.get("current_assets"),
-        current_liabilities=data.get("current_liabilities"),
-        revenue=data.get("revenue"),
-        net_income=data.get("net_income"),
-        earnings_per_share=data.get("earnings_per_share"),
-        operating_cash_flow=data.get("operating_cash_flow"),
-        investing_cash_flow=data.get("investing_cash_flow"),
-        financing_cash_flow=data.get("financing_cash_flow"),
-        gross_profit=data.get("gross_profit"),
-        operating_income=data.get("operating_income"),
-        raw_data=data.get("raw_data"),
-    )
+    # 提取财务数据（数据源已完成数值解析，按 schema 字段直接取值，不再经 pydantic 往返）
+    financial_data = {k: data.get(k) for k in _FINANCIAL_FIELDS}
 
     response = {
         "symbol": symbol,
@@ -98,14 +86,14 @@ def get_financial_report(
         "report_type": report_type,
         "period": period,
         "report_date": report_date,
-        "data": financial_data.model_dump(),
+        "data": financial_data,
         "source": provider_name,
         "fetched_at": now.isoformat(),
         "is_cached": False,
     }
 
-    # 存入缓存
-    financial_report_cache[cache_key] = response
+    # 存入缓存（缓存副本预先标记为已缓存，命中时直接返回，不再原地修改共享对象）
+    financial_report_cache[cache_key] = response | {"is_cached": True}
     logger.info(f"[财报服务] 数据获取成功 | 股票: {symbol} | 类型: {report_type} | 数据源: {provider_name}")
 
     return response
@@ -5,11 +5,12 @@
 """
 
 import logging
-from typing import Optional, Dict, List
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
-from zoneinfo import ZoneInfo
 
 from ...providers import get_coordinator
+from .. import macro_cache, BEIJING_TZ, _single_flight
 from ...schemas.advanced import (
     MacroIndicatorsResponse,
     MacroIndicatorValue,
@@ -18,6 +19,12 @@ from ...schemas.advanced import (
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=64)
+def _macro_cache_key(market: str, indicators: Tuple[str, ...]) -> Tuple[str, Tuple[str, ...]]:
+    """生成宏观指标缓存键（指标顺序无关），同一组指标只排序一次"""
+    return (market, tuple(sorted(indicators)))
+
+
 def get_macro_indicators(
     market: str = "cn",
     indicators: Optional[List[str]] = None,
@@ -34,22 +41,24 @@ def get_macro_indicators(
     Returns:
         Dict: 宏观指标响应或错误响应
     """
-    from .. import macro_cache
-
     if indicators is None:
         indicators = ["gdp", "cpi", "interest_rate"]
 
     # 检查缓存
-    cache_key = f"{market}:{','.join(sorted(indicators))}"
-    if use_cache and cache_key in macro_cache:
-        logger.info(f"[宏观服务] 缓存命中 | 市场: {market}")
-        cached = macro_cache[cache_key]
-        cached["is_cached"] = True
-        return cached
+    cache_key = _macro_cache_key(market, tuple(indicators))
+    if use_cache:
+        cached = macro_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[宏观服务] 缓存命中 | 市场: {market}")
+            return cached
 
     # 获取数据
     coordinator = get_coordinator()
-    data, provider_name = coordinator.get_macro_indicators(market, indicators)
+    # 同一组指标的并发未命中请求合并为一次数据源调用
+    data, provider_name = _single_flight(
+        ("macro", cache_key),
+        lambda: coordinator.get_macro_indicators(market, indicators)
+    )
 
     if data is None:
         return {
@@ -60,7 +69,7 @@ def get_macro_indicators(
         }
 
     # 构建响应
-    now = datetime.now(ZoneInfo("Asia/Shanghai"))
+    now = datetime.now(BEIJING_TZ)
 
     # 转换指标列表
     indicator_list = []
@@ -90,8 +99,8 @@ def get_macro_indicators(
         "is_cached": False,
     }
 
-    # 存入缓存
-    macro_cache[cache_key] = response
+    # 存入缓存（缓存副本预先标记为已缓存，命中时直接返回，不再原地修改共享对象）
+    macro_cache[cache_key] = response | {"is_cached": True}
     logger.info(f"[宏观服务] 数据获取成功 | 市场: {market} | 数据源: {provider_name}")
 
     return response
@@ -7,9 +7,9 @@
 import logging
 from typing import Optional, Dict
 from datetime import datetime
-from zoneinfo import ZoneInfo
 
 from ...providers import get_coordinator
+from .. import valuation_cache, BEIJING_TZ, _single_flight
 from ...schemas.advanced import (
     ValuationMetricsResponse,
     ValuationMetricsData,
@@ -17,6 +17,9 @@ from ...schemas.advanced import (
 
 logger = logging.getLogger(__name__)
 
+# 估值指标字段（与 ValuationMetricsData 保持一致）
+_VALUATION_FIELDS = tuple(ValuationMetricsData.model_fields)
+
 
 def get_valuation_metrics(
     symbol: str,
@@ -40,20 +43,20 @@ def get_valuation_metrics(
     Returns:
         Dict: 估值指标响应或错误响应
     """
-    from .. import valuation_cache
-
     # 检查缓存
-    cache_key = f"{symbol}:valuation"
-    if use_cache and cache_key in valuation_cache:
-        logger.info(f"[估值服务] 缓存命中 | 股票: {symbol}")
-        cached = valuation_cache[cache_key]
-        cached["is_cached"] = True
-        return cached
+    cache_key = symbol
+    if use_cache:
+        cached = valuation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[估值服务] 缓存命中 | 股票: {symbol}")
+            return cached
 
     # 获取数据
     coordinator = get_coordinator()
-    data, provider_name = coordinator.get_valuation_metrics(
-        symbol, normalized_code, market
+    # 同一股票的并发未命中请求合并为一次数据源调用
+    data, provider_name = _single_flight(
+        ("valuation", symbol),
+        lambda: coordinator.get_valuation_metrics(symbol, normalized_code, market)
     )
 
     if data is None:
@@ -64,38 +67,24 @@ def get_valuation_metrics(
         }
 
     # 构建响应
-    now = datetime.now(ZoneInfo("Asia/Shanghai"))
-
-    # 提取估值指标
-    metrics_data = ValuationMetricsData(
-        pe_ratio=data.get("pe_ratio"),
-        pb_ratio=data.get("pb_ratio"),
-        ps_ratio=data.get("ps_ratio"),
-        roe=data.get("roe"),
-        roa=data.get("roa"),
-        revenue_growth=data.get("revenue_growth"),
-        profit_margin=data.get("profit_margin"),
-        gross_margin=data.get("gross_margin"),
-        debt_to_equity=data.get("debt_to_equity"),
-        current_ratio=data.get("current_ratio"),
-        dividend_yield=data.get("dividend_yield"),
-        eps=data.get("eps"),
-        book_value_per_share=data.get("book_value_per_share"),
-    )
+    now = datetime.now(BEIJING_TZ)
+
+    # 提取估值指标（数据源已完成数值解析，按 schema 字段直接取值，不再经 pydantic 往返）
+    metrics_data = {k: data.get(k) for k in _VALUATION_FIELDS}
 
     response = {
         "symbol": symbol,
         "name": name,
         "current_price": current_price,
-        "metrics": metrics_data.model_dump(),
+        "metrics": metrics_data,
         "industry_avg": None,  # 暂不支持行业均值
         "source": provider_name,
         "fetched_at": now.isoformat(),
         "is_cached": False,
     }
 
-    # 存入缓存
-    valuation_cache[cache_key] = response
+    # 存入缓存（缓存副本预先标记为已缓存，命中时直接返回，不再原地修改共享对象）
+    valuation_cache[cache_key] = response | {"is_cached": True}
     logger.info(f"[估值服务] 数据获取成功 | 股票: {symbol} | 数据源: {provider_name}")
 
     return response
@@ -10,19 +10,124 @@
 """
 
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, FrozenSet, Union
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from cachetools import TTLCache
+
+try:
+    from numba import njit
+except ImportError:
+    # numba 为可选加速，未安装时 EMA 递推使用纯 Python 实现
+    njit = None
 
 logger = logging.getLogger(__name__)
 
+# 指标结果缓存：(close, high, low 原始字节) -> calc_all_indicators 结果
+# 指标是输入窗口的纯函数，以窗口内容为键；K 线按日缓存，盘中同一窗口会被反复计算
+_indicator_result_cache = TTLCache(maxsize=1000, ttl=600)
+_indicator_cache_lock = threading.Lock()
+
 
-def calc_ma(df: pd.DataFrame, periods: List[int] = [5, 10, 20, 60]) -> Dict[str, Any]:
+def closes_frame(closes) -> pd.DataFrame:
+    """
+    由收盘价序列构建指标计算用的 K 线 DataFrame
+
+    只有收盘价时开高低收取相同值：列表只转换一次为 float64 数组，各列由该数组构建。
+
+    Args:
+        closes: 收盘价序列（list 或 np.ndarray）
+
+    Returns:
+        pd.DataFrame: 包含 'open', 'high', 'low', 'close', 'volume' 列
+    """
+    arr = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({
+        'open': arr,
+        'high': arr,
+        'low': arr,
+        'close': arr,
+        'volume': np.zeros(len(arr), dtype=np.int64)
+    }, copy=False)
+
+
+@dataclass
+class _IndicatorCtx:
+    """
+    指标计算上下文
+
+    close/high/low 各自只从 DataFrame 中取出一次，转换为连续的 float64 数组后在各指标间共享。
+    """
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+
+def _as_ctx(data: Union[pd.DataFrame, _IndicatorCtx, None]) -> Optional[_IndicatorCtx]:
+    """将 DataFrame 转换为指标计算上下文（已是上下文则原样返回）"""
+    if data is None or isinstance(data, _IndicatorCtx):
+        return data
+    return _IndicatorCtx(
+        close=np.ascontiguousarray(data['close'].to_numpy(dtype=np.float64, copy=False)),
+        high=np.ascontiguousarray(data['high'].to_numpy(dtype=np.float64, copy=False)),
+        low=np.ascontiguousarray(data['low'].to_numpy(dtype=np.float64, copy=False)),
+    )
+
+
+def _sma_tail(values: np.ndarray, period: int, count: int) -> np.ndarray:
+    """计算简单移动平均的最后 count 个值（只对尾部窗口求均值；单个值直接用 values[-period:].mean()）"""
+    return sliding_window_view(values[-(period + count - 1):], period).mean(axis=1)
+
+
+def _ema_kernel(values, alpha: float, out: np.ndarray) -> None:
+    """EMA 递推内核：结果写入 out（安装 numba 时 JIT 编译）"""
+    decay = 1.0 - alpha
+    weighted = np.nan
+    old_wt = 1.0
+    for i in range(len(values)):
+        cur = values[i]
+        if weighted == weighted:
+            old_wt *= decay
+            if cur == cur:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif cur == cur:
+            weighted = cur
+        out[i] = weighted
+
+
+if njit is not None:
+    # 不开 fastmath：递推依赖 NaN 判断，fastmath 会假定不存在 NaN
+    _ema_kernel = njit(cache=True)(_ema_kernel)
+    # 导入时预热，避免首个请求承担编译开销
+    _ema_kernel(np.zeros(2), 0.5, np.empty(2))
+
+
+def _ema(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    指数移动平均，与 pandas ewm(alpha=alpha, adjust=False).mean() 结果一致
+
+    前导 NaN 保持为 NaN；中间的 NaN 沿用上一个值，且旧权重继续衰减（ignore_na=False 语义）。
+    """
+    out = np.empty(len(values), dtype=np.float64)
+    # 纯 Python 回退时逐元素访问 list 比访问 ndarray 快
+    _ema_kernel(values if njit is not None else values.tolist(), alpha, out)
+    return out
+
+
+def calc_ma(df: Union[pd.DataFrame, _IndicatorCtx], periods: List[int] = [5, 10, 20, 60]) -> Dict[str, Any]:
     """
     计算移动平均线
 
     Args:
-        df: K线数据，需包含 'close' 列
+        df: K线数据（DataFrame 需包含 'close' 列）或指标计算上下文
         periods: 计算周期列表
 
     Returns:
@@ -32,21 +137,18 @@ def calc_ma(df: pd.DataFrame, periods: List[int] = [5, 10, 20, 60]) -> Dict[str,
         return {"values": {}, "signals": []}
 
     result = {"values": {}, "signals": []}
-    close = df['close']
+    close = _as_ctx(df).close
 
     for period in periods:
         if len(close) >= period:
-            ma_value = close.rolling(window=period).mean().iloc[-1]
+            ma_value = close[-period:].mean()
             result["values"][f"MA{period}"] = round(float(ma_value), 2)
 
-    # 检测 MA 金叉/死叉 (MA5 vs MA20)
-    if len(close) >= 20:
-        ma5 = close.rolling(window=5).mean()
-        ma20 = close.rolling(window=20).mean()
-
+    # 检测 MA 金叉/死叉 (MA5 vs MA20)，需要前一日的 MA20，即至少 21 根 K 线
+    if len(close) >= 21:
         # 前一日和当日的关系
-        prev_ma5, prev_ma20 = ma5.iloc[-2], ma20.iloc[-2]
-        curr_ma5, curr_ma20 = ma5.iloc[-1], ma20.iloc[-1]
+        prev_ma5, curr_ma5 = _sma_tail(close, 5, 2)
+        prev_ma20, curr_ma20 = _sma_tail(close, 20, 2)
 
         if prev_ma5 <= prev_ma20 and curr_ma5 > curr_ma20:
             result["signals"].append({
@@ -66,12 +168,12 @@ def calc_ma(df: pd.DataFrame, periods: List[int] = [5, 10, 20, 60]) -> Dict[str,
     return result
 
 
-def calc_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, Any]:
+def calc_macd(df: Union[pd.DataFrame, _IndicatorCtx], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, Any]:
     """
     计算 MACD 指标
 
     Args:
-        df: K线数据，需包含 'close' 列
+        df: K线数据（DataFrame 需包含 'close' 列）或指标计算上下文
         fast: 快线周期
         slow: 慢线周期
         signal: 信号线周期
@@ -84,31 +186,31 @@ def calc_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9)
         return {"values": {}, "signals": []}
 
     result = {"values": {}, "signals": []}
-    close = df['close']
+    close = _as_ctx(df).close
 
     # 计算 EMA
-    ema_fast = close.ewm(span=fast, adjust=False).mean()
-    ema_slow = close.ewm(span=slow, adjust=False).mean()
+    ema_fast = _ema(close, 2.0 / (fast + 1))
+    ema_slow = _ema(close, 2.0 / (slow + 1))
 
     # DIF = 快线EMA - 慢线EMA
     dif = ema_fast - ema_slow
 
     # DEA = DIF 的 EMA
-    dea = dif.ewm(span=signal, adjust=False).mean()
+    dea = _ema(dif, 2.0 / (signal + 1))
 
     # MACD 柱 = 2 * (DIF - DEA)
-    macd_hist = 2 * (dif - dea)
+    macd_hist = 2 * (dif[-1] - dea[-1])
 
     result["values"] = {
-        "DIF": round(float(dif.iloc[-1]), 4),
-        "DEA": round(float(dea.iloc[-1]), 4),
-        "MACD": round(float(macd_hist.iloc[-1]), 4)
+        "DIF": round(float(dif[-1]), 4),
+        "DEA": round(float(dea[-1]), 4),
+        "MACD": round(float(macd_hist), 4)
     }
 
     # 检测 MACD 金叉/死叉
     if len(dif) >= 2:
-        prev_dif, prev_dea = dif.iloc[-2], dea.iloc[-2]
-        curr_dif, curr_dea = dif.iloc[-1], dea.iloc[-1]
+        prev_dif, prev_dea = dif[-2], dea[-2]
+        curr_dif, curr_dea = dif[-1], dea[-1]
 
         if prev_dif <= prev_dea and curr_dif > curr_dea:
             result["signals"].append({
@@ -126,12 +228,12 @@ def calc_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9)
     return result
 
 
-def calc_rsi(df: pd.DataFrame, period: int = 14) -> Dict[str, Any]:
+def calc_rsi(df: Union[pd.DataFrame, _IndicatorCtx], period: int = 14) -> Dict[str, Any]:
     """
     计算 RSI 相对强弱指标
 
     Args:
-        df: K线数据，需包含 'close' 列
+        df: K线数据（DataFrame 需包含 'close' 列）或指标计算上下文
         period: 计算周期
 
     Returns:
@@ -141,24 +243,24 @@ def calc_rsi(df: pd.DataFrame, period: int = 14) -> Dict[str, Any]:
         return {"values": {}, "signals": []}
 
     result = {"values": {}, "signals": []}
-    close = df['close']
+    close = _as_ctx(df).close
 
-    # 计算价格变化
-    delta = close.diff()
+    # 计算价格变化（只需最后一个窗口）
+    delta = np.diff(close[-(period + 1):])
 
-    # 分离上涨和下跌
-    gain = delta.where(delta > 0, 0)
-    loss = (-delta).where(delta < 0, 0)
+    # 分离上涨和下跌（NaN 变化记为 0，与 pandas where 结果一致）
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
 
     # 计算平均上涨和下跌
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
+    avg_gain = gain.mean()
+    avg_loss = loss.mean()
 
-    # 计算 RS 和 RSI
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+    # 计算 RS 和 RSI（无下跌时 RSI 为 100，无波动时为 NaN，与 pandas 结果一致）
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi_value = 100 - (100 / (1 + rs))
 
-    rsi_value = rsi.iloc[-1]
     result["values"] = {"RSI": round(float(rsi_value), 2)}
 
     # 判断超买超卖
@@ -180,12 +282,12 @@ def calc_rsi(df: pd.DataFrame, period: int = 14) -> Dict[str, Any]:
     return result
 
 
-def calc_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> Dict[str, Any]:
+def calc_kdj(df: Union[pd.DataFrame, _IndicatorCtx], n: int = 9, m1: int = 3, m2: int = 3) -> Dict[str, Any]:
     """
     计算 KDJ 随机指标
 
     Args:
-        df: K线数据，需包含 'high', 'low', 'close' 列
+        df: K线数据（DataFrame 需包含 'high', 'low', 'close' 列）或指标计算上下文
         n: RSV 周期
         m1: K 值平滑周期
         m2: D 值平滑周期
@@ -197,27 +299,30 @@ def calc_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> Dict[str
         return {"values": {}, "signals": []}
 
     result = {"values": {}, "signals": []}
+    ctx = _as_ctx(df)
 
-    # 计算 RSV
-    low_n = df['low'].rolling(window=n).min()
-    high_n = df['high'].rolling(window=n).max()
-    rsv = (df['close'] - low_n) / (high_n - low_n) * 100
+    # 计算 RSV（前 n-1 根 K 线不足一个窗口，为 NaN）
+    low_n = sliding_window_view(ctx.low, n).min(axis=1)
+    high_n = sliding_window_view(ctx.high, n).max(axis=1)
+    rsv = np.full(len(ctx), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv[n - 1:] = (ctx.close[n - 1:] - low_n) / (high_n - low_n) * 100
 
     # 计算 K、D、J
-    k = rsv.ewm(alpha=1/m1, adjust=False).mean()
-    d = k.ewm(alpha=1/m2, adjust=False).mean()
-    j = 3 * k - 2 * d
+    k = _ema(rsv, 1 / m1)
+    d = _ema(k, 1 / m2)
+    j = 3 * k[-1] - 2 * d[-1]
 
     result["values"] = {
-        "K": round(float(k.iloc[-1]), 2),
-        "D": round(float(d.iloc[-1]), 2),
-        "J": round(float(j.iloc[-1]), 2)
+        "K": round(float(k[-1]), 2),
+        "D": round(float(d[-1]), 2),
+        "J": round(float(j), 2)
     }
 
     # 检测 KDJ 金叉/死叉
     if len(k) >= 2:
-        prev_k, prev_d = k.iloc[-2], d.iloc[-2]
-        curr_k, curr_d = k.iloc[-1], d.iloc[-1]
+        prev_k, prev_d = k[-2], d[-2]
+        curr_k, curr_d = k[-1], d[-1]
 
         if prev_k <= prev_d and curr_k > curr_d:
             result["signals"].append({
@@ -235,12 +340,12 @@ def calc_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> Dict[str
     return result
 
 
-def calc_bollinger(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0) -> Dict[str, Any]:
+def calc_bollinger(df: Union[pd.DataFrame, _IndicatorCtx], period: int = 20, std_dev: float = 2.0) -> Dict[str, Any]:
     """
     计算布林带指标
 
     Args:
-        df: K线数据，需包含 'close' 列
+        df: K线数据（DataFrame 需包含 'close' 列）或指标计算上下文
         period: 计算周期
         std_dev: 标准差倍数
 
@@ -251,22 +356,18 @@ def calc_bollinger(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0) ->
         return {"values": {}, "signals": []}
 
     result = {"values": {}, "signals": []}
-    close = df['close']
-
-    # 计算中轨（MA）
-    middle = close.rolling(window=period).mean()
+    close = _as_ctx(df).close
 
-    # 计算标准差
-    std = close.rolling(window=period).std()
+    # 中轨（MA）与标准差只需最后一个窗口
+    window = close[-period:]
+    middle_val = window.mean()
+    std = window.std(ddof=1)
 
     # 计算上下轨
-    upper = middle + std_dev * std
-    lower = middle - std_dev * std
+    upper_val = middle_val + std_dev * std
+    lower_val = middle_val - std_dev * std
 
-    current_price = close.iloc[-1]
-    upper_val = upper.iloc[-1]
-    middle_val = middle.iloc[-1]
-    lower_val = lower.iloc[-1]
+    current_price = close[-1]
 
     result["values"] = {
         "upper": round(float(upper_val), 2),
@@ -292,49 +393,70 @@ def calc_bollinger(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0) ->
     return result
 
 
-def calc_all_indicators(df: pd.DataFrame) -> Dict[str, Any]:
+# 指标名称 -> 计算函数（顺序即汇总信号的顺序）
+INDICATOR_CALCULATORS = {
+    "MA": calc_ma,
+    "MACD": calc_macd,
+    "RSI": calc_rsi,
+    "KDJ": calc_kdj,
+    "Bollinger": calc_bollinger,
+}
+
+
+def calc_all_indicators(df: pd.DataFrame, which: Optional[FrozenSet[str]] = None,
+                        with_prev: bool = False) -> Dict[str, Any]:
     """
     计算所有技术指标
 
+    相同 K 线窗口的结果会被缓存并共享，调用方不应修改返回的字典。
+
     Args:
         df: K线数据，需包含 'open', 'high', 'low', 'close', 'volume' 列
+        which: 只计算的指标名称集合（见 INDICATOR_CALCULATORS），None 表示全部计算
+        with_prev: 是否同时计算前一日（排除最后一根 K 线）的指标值，交叉判断使用
 
     Returns:
-        Dict: 包含所有指标和信号
+        Dict: 包含所有指标和信号（指定 which 时只包含所选指标）；
+        with_prev 时另含 'prev_indicators'，前一日数据不足 20 根时为 None
     """
     if df is None or len(df) < 5:
         return {"indicators": {}, "signals": [], "current_price": None}
 
+    # 收盘/最高/最低价只提取一次，各指标共享
+    ctx = _as_ctx(df)
+
+    cache_key = (ctx.close.tobytes(), ctx.high.tobytes(), ctx.low.tobytes(), which, with_prev)
+    with _indicator_cache_lock:
+        cached = _indicator_result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     result = {
         "indicators": {},
         "signals": [],
-        "current_price": round(float(df['close'].iloc[-1]), 2)
+        "current_price": round(float(ctx.close[-1]), 2)
     }
 
-    # 计算各指标
-    ma_result = calc_ma(df)
-    macd_result = calc_macd(df)
-    rsi_result = calc_rsi(df)
-    kdj_result = calc_kdj(df)
-    boll_result = calc_bollinger(df)
-
-    # 汇总指标值
-    result["indicators"]["MA"] = ma_result.get("values", {})
-    result["indicators"]["MACD"] = macd_result.get("values", {})
-    result["indicators"]["RSI"] = rsi_result.get("values", {})
-    result["indicators"]["KDJ"] = kdj_result.get("values", {})
-    result["indicators"]["Bollinger"] = boll_result.get("values", {})
-
-    # 汇总信号
-    for signal in ma_result.get("signals", []):
-        result["signals"].append(signal)
-    for signal in macd_result.get("signals", []):
-        result["signals"].append(signal)
-    for signal in rsi_result.get("signals", []):
-        result["signals"].append(signal)
-    for signal in kdj_result.get("signals", []):
-        result["signals"].append(signal)
-    for signal in boll_result.get("signals", []):
-        result["signals"].append(signal)
-
+    # 计算各指标，汇总指标值和信号（未请求的指标直接跳过）
+    for name, calc in INDICATOR_CALCULATORS.items():
+        if which is not None and name not in which:
+            continue
+        indicator_result = calc(ctx)
+        result["indicators"][name] = indicator_result.get("values", {})
+        result["signals"].extend(indicator_result.get("signals", []))
+
+    if with_prev:
+        # 前一日指标直接在数组视图上计算，无需切片 DataFrame 再走一遍完整流程
+        prev_ctx = _IndicatorCtx(close=ctx.close[:-1], high=ctx.high[:-1], low=ctx.low[:-1])
+        prev_values = None
+        if len(prev_ctx) >= 20:
+            prev_values = {
+                name: calc(prev_ctx).get("values", {})
+                for name, calc in INDICATOR_CALCULATORS.items()
+                if which is None or name in which
+            }
+        result["prev_indicators"] = prev_values
+
+    with _indicator_cache_lock:
+        _indicator_result_cache[cache_key] = result
     return result
@@ -5,8 +5,8 @@
 """
 
 import logging
-import json
-from typing import Optional, List, Dict, Any
+import orjson
+from typing import Callable, FrozenSet, NamedTuple, Optional, List, Dict, Any, Tuple
 from datetime import date
 
 from .indicators import calc_all_indicators
@@ -14,6 +14,55 @@ from .indicators import calc_all_indicators
 logger = logging.getLogger(__name__)
 
 
+def calc_prev_indicators(df) -> Optional[Dict[str, Any]]:
+    """
+    计算前一日（排除最后一根 K 线）的指标，交叉判断使用
+
+    Args:
+        df: K线数据 DataFrame
+
+    Returns:
+        前一日的指标数据，数据不足时返回 None
+    """
+    if df is None or len(df) < 21:  # 排除当日后需要至少 20 根 K 线计算指标
+        return None
+    # 前一日指标由 calc_all_indicators 在数组视图上计算（与当日指标共用缓存），无需切片复制 DataFrame
+    prev_values = calc_all_indicators(df, with_prev=True).get("prev_indicators")
+    return {"indicators": prev_values} if prev_values is not None else None
+
+
+def _flatten_indicators(indicators: Dict[str, Any]) -> Dict[Tuple[str, str], Any]:
+    """将 calc_all_indicators 的嵌套指标值展开为 (指标类型, 字段) -> 值，取值只需一次查找"""
+    return {
+        (indicator_type, field): value
+        for indicator_type, values in indicators.get("indicators", {}).items()
+        for field, value in values.items()
+    }
+
+
+class _Condition(NamedTuple):
+    """解析后的条件（规则加载时由条件配置字典生成）"""
+    indicator: Optional[str]
+    field: Optional[str]
+    operator: Optional[str]
+    target_type: Optional[str]
+    target_indicator: Optional[str]
+    target_field: Optional[str]
+    target_value: Any
+
+    @classmethod
+    def from_dict(cls, condition: Dict[str, Any]) -> "_Condition":
+        return cls(
+            condition.get("indicator"),
+            condition.get("field"),
+            condition.get("operator"),
+            condition.get("target_type"),
+            condition.get("target_indicator"),
+            condition.get("target_field"),
+            condition.get("target_value"),
+        )
+
+
 class ConditionParser:
     """条件解析器 - 解析和评估触发条件"""
 
@@ -33,16 +82,22 @@ class ConditionParser:
     # 交叉操作符（需要历史数据）
     CROSS_OPERATORS = ["cross_above", "cross_below"]
 
-    def __init__(self, indicators: Dict[str, Any], df_history=None):
+    def __init__(self, indicators: Dict[str, Any], df_history=None,
+                 prev_indicators: Optional[Dict[str, Any]] = None):
         """
         初始化条件解析器
 
         Args:
             indicators: calc_all_indicators 返回的指标数据
             df_history: K线历史数据 DataFrame（交叉操作需要）
+            prev_indicators: 前一日的指标数据（可选，传入则交叉操作不再重新计算）
         """
         self.indicators = indicators
+        self._values = _flatten_indicators(indicators)
         self.df_history = df_history
+        self.prev_indicators = prev_indicators
+        # 前一日指标的解析器，首次交叉判断时创建，后续交叉条件复用
+        self._prev_parser = None
 
     def get_indicator_value(self, indicator_type: str, field: str) -> Optional[float]:
         """
@@ -55,64 +110,78 @@ class ConditionParser:
         Returns:
             指标值，不存在则返回 None
         """
-        indicator_values = self.indicators.get("indicators", {}).get(indicator_type, {})
-        return indicator_values.get(field)
+        return self._values.get((indicator_type, field))
 
-    def evaluate_condition(self, condition: Dict[str, Any]) -> bool:
+    @classmethod
+    def compile(cls, condition: Dict[str, Any]) -> Callable[["ConditionParser"], bool]:
         """
-        评估单个条件
+        将条件编译为判定函数
+
+        条件结构在规则加载后不再变化：指标、字段、目标和操作符在编译时取出并绑定，
+        评估时只需取值比较。
 
         Args:
             condition: 条件配置字典
 
         Returns:
-            条件是否满足
+            判定函数，参数为 ConditionParser，返回条件是否满足
         """
-        operator = condition.get("operator")
-        target_type = condition.get("target_type")
-
-        # 获取左值
-        left_value = self.get_indicator_value(
-            condition.get("indicator"),
-            condition.get("field")
-        )
-        if left_value is None:
-            logger.warning(f"无法获取指标值: {condition.get('indicator')}.{condition.get('field')}")
+        cond = _Condition.from_dict(condition)
+        indicator, field, operator, target_type, target_indicator, target_field, target_value = cond
+        is_cross = operator in cls.CROSS_OPERATORS
+        compare = cls.OPERATORS.get(operator)
+
+        def predicate(parser: "ConditionParser") -> bool:
+            # 获取左值
+            left_value = parser.get_indicator_value(indicator, field)
+            if left_value is None:
+                logger.warning(f"无法获取指标值: {indicator}.{field}")
+                return False
+
+            # 获取右值
+            if target_type == "indicator":
+                right_value = parser.get_indicator_value(target_indicator, target_field)
+            elif target_type == "value":
+                right_value = target_value
+            else:
+                logger.warning(f"未知的 target_type: {target_type}")
+                return False
+
+            if right_value is None:
+                logger.warning(f"无法获取目标值: {condition}")
+                return False
+
+            # 交叉操作需要历史数据
+            if is_cross:
+                return parser._evaluate_cross(cond, left_value, right_value)
+
+            # 普通比较操作
+            if compare is not None:
+                return compare(left_value, right_value)
+
+            logger.warning(f"未知的操作符: {operator}")
             return False
 
-        # 获取右值
-        if target_type == "indicator":
-            right_value = self.get_indicator_value(
-                condition.get("target_indicator"),
-                condition.get("target_field")
-            )
-        elif target_type == "value":
-            right_value = condition.get("target_value")
-        else:
-            logger.warning(f"未知的 target_type: {target_type}")
-            return False
+        return predicate
 
-        if right_value is None:
-            logger.warning(f"无法获取目标值: {condition}")
-            return False
-
-        # 交叉操作需要历史数据
-        if operator in self.CROSS_OPERATORS:
-            return self._evaluate_cross(condition, left_value, right_value)
+    def evaluate_condition(self, condition: Dict[str, Any]) -> bool:
+        """
+        评估单个条件
 
-        # 普通比较操作
-        if operator in self.OPERATORS:
-            return self.OPERATORS[operator](left_value, right_value)
+        Args:
+            condition: 条件配置字典
 
-        logger.warning(f"未知的操作符: {operator}")
-        return False
+        Returns:
+            条件是否满足
+        """
+        return self.compile(condition)(self)
 
-    def _evaluate_cross(self, condition: Dict[str, Any], curr_left: float, curr_right: float) -> bool:
+    def _evaluate_cross(self, condition: _Condition, curr_left: float, curr_right: float) -> bool:
         """
         评估交叉条件（需要历史数据）
 
         Args:
-            condition: 条件配置
+            condition: 解析后的条件
             curr_left: 当日左值
             curr_right: 当日右值
 
@@ -122,26 +191,23 @@ class ConditionParser:
         if self.df_history is None or len(self.df_history) < 2:
             return False
 
-        operator = condition.get("operator")
+        operator = condition.operator
 
-        # 计算前一天的指标值
-        # 这里简化处理：重新计算前一天的所有指标
-        # 实际优化可以缓存历史指标
-        df_prev = self.df_history.iloc[:-1]  # 排除最后一行（当日）
-        if len(df_prev) < 20:  # 需要足够数据计算指标
-            return False
+        # 前一天的指标值：优先使用调用方预先计算的结果，否则首次使用时计算一次
+        if self._prev_parser is None:
+            prev_indicators = self.prev_indicators
+            if prev_indicators is None:
+                prev_indicators = calc_prev_indicators(self.df_history)
+            if prev_indicators is None:
+                return False
+            self._prev_parser = ConditionParser(prev_indicators)
+        prev_parser = self._prev_parser
 
-        prev_indicators = calc_all_indicators(df_prev)
-        prev_parser = ConditionParser(prev_indicators)
-
-        prev_left = prev_parser.get_indicator_value(
-            condition.get("indicator"),
-            condition.get("field")
-        )
+        prev_left = prev_parser.get_indicator_value(condition.indicator, condition.field)
         prev_right = prev_parser.get_indicator_value(
-            condition.get("target_indicator"),
-            condition.get("target_field")
-        ) if condition.get("target_type") == "indicator" else condition.get("target_value")
+            condition.target_indicator,
+            condition.target_field
+        ) if condition.target_type == "indicator" else condition.target_value
 
         if prev_left is None or prev_right is None:
             return False
@@ -170,25 +236,39 @@ class ConditionParser:
 
         return all(self.evaluate_condition(cond) for cond in conditions)
 
+    def evaluate_compiled(self, predicates: List[Callable[["ConditionParser"], bool]]) -> bool:
+        """
+        评估已编译的条件（AND 组合）
+
+        Args:
+            predicates: compile 生成的判定函数列表
+
+        Returns:
+            所有条件是否都满足
+        """
+        return all(predicate(self) for predicate in predicates)
+
 
 class PriceCalculator:
     """价位计算器 - 计算入场价、止损价、止盈价"""
 
-    def __init__(self, indicators: Dict[str, Any], current_price: float):
+    def __init__(self, indicators: Dict[str, Any], current_price: float,
+                 values: Optional[Dict[Tuple[str, str], Any]] = None):
         """
         初始化价位计算器
 
         Args:
             indicators: calc_all_indicators 返回的指标数据
             current_price: 当前价格
+            values: 已展开的指标查找表（可选，与 ConditionParser 共用，避免重复展开）
         """
         self.indicators = indicators
+        self._values = values if values is not None else _flatten_indicators(indicators)
         self.current_price = current_price
 
     def get_indicator_value(self, indicator_type: str, field: str) -> Optional[float]:
         """获取指定指标的值"""
-        indicator_values = self.indicators.get("indicators", {}).get(indicator_type, {})
-        return indicator_values.get(field)
+        return self._values.get((indicator_type, field))
 
     def calculate_entry_price(self, config: Dict[str, Any]) -> Optional[float]:
         """
@@ -246,6 +326,110 @@ class PriceCalculator:
         return None
 
 
+def _condition_cost(condition: Dict[str, Any]) -> int:
+    """条件评估代价：交叉条件需要前一日指标，其余为标量比较"""
+    return 10 if condition.get("operator") in ConditionParser.CROSS_OPERATORS else 1
+
+
+class _ParsedRule(NamedTuple):
+    """规则加载时解析、编译出的配置"""
+    predicates: List[Callable[[ConditionParser], bool]]
+    price_config: Dict[str, Any]
+    describe: Callable[[Optional[float]], str]
+    indicator_types: FrozenSet[str]
+
+
+def _compile_description(rule: Any) -> Callable[[Optional[float]], str]:
+    """
+    将描述模板编译为格式化函数
+
+    不含花括号的模板原样返回，省去每次评估的 format 调用和异常处理。
+
+    Args:
+        rule: TradingRule 模型实例
+
+    Returns:
+        格式化函数，参数为入场价
+    """
+    template = rule.description_template or f"{rule.name}触发"
+    if "{" not in template and "}" not in template:
+        return lambda entry_price: template
+
+    def describe(entry_price: Optional[float]) -> str:
+        if entry_price:
+            try:
+                return template.format(entry_price=entry_price)
+            except KeyError:
+                pass
+        return template
+
+    return describe
+
+
+def _collect_indicator_types(conditions: List[Dict[str, Any]], price_config: Any) -> FrozenSet[str]:
+    """
+    收集规则条件和价位配置引用到的指标类型
+
+    Args:
+        conditions: 条件配置列表
+        price_config: 价位配置
+
+    Returns:
+        指标类型集合，如 {"MA", "Bollinger"}
+    """
+    types = set()
+    for cond in conditions:
+        types.add(cond.get("indicator"))
+        if cond.get("target_type") == "indicator":
+            types.add(cond.get("target_indicator"))
+    if isinstance(price_config, dict):
+        for key in ("entry", "stop_loss", "take_profit"):
+            config = price_config.get(key)
+            if isinstance(config, dict) and config.get("type") == "indicator":
+                types.add(config.get("indicator"))
+    types.discard(None)
+    return frozenset(types)
+
+
+def _parse_rule_config(rule: Any) -> Optional[_ParsedRule]:
+    """
+    解析规则的条件配置和价位配置，并将条件和描述模板编译为函数
+
+    Args:
+        rule: TradingRule 模型实例
+
+    Returns:
+        解析后的规则配置，解析失败返回 None
+    """
+    # 解析条件配置
+    try:
+        conditions = orjson.loads(rule.conditions) if isinstance(rule.conditions, str) else rule.conditions
+        if isinstance(conditions, dict) and "conditions" in conditions:
+            conditions = conditions["conditions"]
+    except (orjson.JSONDecodeError, TypeError):
+        logger.error(f"规则 {rule.id} 条件配置解析失败")
+        return None
+
+    # 解析价位配置
+    try:
+        price_config = orjson.loads(rule.price_config) if isinstance(rule.price_config, str) else rule.price_config
+    except (orjson.JSONDecodeError, TypeError):
+        logger.error(f"规则 {rule.id} 价位配置解析失败")
+        return None
+
+    # 编译条件：条件之间为纯 AND 关系，顺序不影响结果，
+    # 按代价升序排列（交叉条件需要前一日指标，放在最后），廉价条件不满足时直接短路
+    try:
+        ordered = sorted(conditions or [], key=_condition_cost)
+        predicates = [ConditionParser.compile(cond) for cond in ordered]
+        indicator_types = _collect_indicator_types(ordered, price_config)
+    except (AttributeError, TypeError):
+        logger.error(f"规则 {rule.id} 条件配置格式错误")
+        return None
+
+    return _ParsedRule(predicates, price_config, _compile_description(rule), indicator_types)
+
+
 class RuleEngine:
     """规则引擎 - 评估规则并生成信号"""
 
@@ -261,8 +445,21 @@ class RuleEngine:
             key=lambda x: x.priority,
             reverse=True
         )
+        # 规则配置 JSON 在构造时解析一次，解析失败的规则直接跳过
+        self._parsed_rules = []
+        for rule in self.rules:
+            config = _parse_rule_config(rule)
+            if config is not None:
+                self._parsed_rules.append((rule, config))
+        # 所有规则用到的指标类型，evaluate_all 只计算这些指标
+        self.required_indicators = frozenset().union(
+            *(config.indicator_types for _, config in self._parsed_rules)
+        )
 
-    def evaluate(self, rule: Any, df, current_price: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    def evaluate(self, rule: Any, df, current_price: Optional[float] = None,
+                 indicators: Optional[Dict[str, Any]] = None,
+                 prev_indicators: Optional[Dict[str, Any]] = None,
+                 config: Optional[_ParsedRule] = None) -> Optional[Dict[str, Any]]:
         """
         评估单条规则
 
@@ -270,12 +467,16 @@ class RuleEngine:
             rule: TradingRule 模型实例
             df: K线数据 DataFrame
             current_price: 当前价格（可选，默认使用最新收盘价）
+            indicators: 预先计算的指标数据（可选，evaluate_all 对所有规则共用一份）
+            prev_indicators: 预先计算的前一日指标数据（可选，交叉条件使用）
+            config: 已解析的规则配置（可选，不传则解析 rule 上的 JSON）
 
         Returns:
             信号字典，条件不满足返回 None
         """
         # 计算指标
-        indicators = calc_all_indicators(df)
+        if indicators is None:
+            indicators = calc_all_indicators(df)
 
         if current_price is None:
             current_price = indicators.get("current_price", 0)
@@ -283,29 +484,40 @@ class RuleEngine:
         if not current_price:
             return None
 
-        # 解析条件配置
-        try:
-            conditions = json.loads(rule.conditions) if isinstance(rule.conditions, str) else rule.conditions
-            if isinstance(conditions, dict) and "conditions" in conditions:
-                conditions = conditions["conditions"]
-        except (json.JSONDecodeError, TypeError):
-            logger.error(f"规则 {rule.id} 条件配置解析失败")
-            return None
+        # 解析规则配置
+        if config is None:
+            config = _parse_rule_config(rule)
+            if config is None:
+                return None
 
-        # 解析价位配置
-        try:
-            price_config = json.loads(rule.price_config) if isinstance(rule.price_config, str) else rule.price_config
-        except (json.JSONDecodeError, TypeError):
-            logger.error(f"规则 {rule.id} 价位配置解析失败")
-            return None
+        parser = ConditionParser(indicators, df, prev_indicators)
+        calculator = PriceCalculator(indicators, current_price)
+        return self._evaluate_parsed(rule, config, parser, calculator)
+
+    def _evaluate_parsed(self, rule: Any, config: _ParsedRule, parser: ConditionParser,
+                         calculator: PriceCalculator) -> Optional[Dict[str, Any]]:
+        """
+        用已解析的规则配置评估单条规则
+
+        parser 与 calculator 只依赖当日指标和当前价格，evaluate_all 对所有规则共用同一组实例。
+
+        Args:
+            rule: TradingRule 模型实例
+            config: 已解析的规则配置
+            parser: 条件解析器
+            calculator: 价位计算器
+
+        Returns:
+            信号字典，条件不满足返回 None
+        """
+        predicates, price_config, describe, _ = config
 
         # 评估条件
-        parser = ConditionParser(indicators, df)
-        if not parser.evaluate_all(conditions):
+        if not parser.evaluate_compiled(predicates):
             return None
 
         # 计算价位
-        calculator = PriceCalculator(indicators, current_price)
+        current_price = calculator.current_price
         entry_price = calculator.calculate_entry_price(price_config.get("entry", {}))
         stop_loss = calculator.calculate_exit_price(price_config.get("stop_loss"), entry_price) if entry_price else None
         take_profit = calculator.calculate_exit_price(price_config.get("take_profit"), entry_price) if entry_price else None
@@ -314,12 +526,7 @@ class RuleEngine:
         triggers = [rule.name]
 
         # 生成描述
-        description = rule.description_template or f"{rule.name}触发"
-        if entry_price:
-            try:
-                description = description.format(entry_price=entry_price)
-            except KeyError:
-                pass
+        description = describe(entry_price)
 
         return {
             "signal_type": rule.rule_type,  # buy 或 sell
@@ -329,7 +536,7 @@ class RuleEngine:
             "take_profit": take_profit,
             "strength": rule.strength,
             "triggers": triggers,
-            "indicators": indicators.get("indicators", {}),
+            "indicators": parser.indicators.get("indicators", {}),
             "message": description,
             "rule_id": rule.id,
             "rule_name": rule.name,
@@ -347,29 +554,49 @@ class RuleEngine:
         Returns:
             最佳信号（按优先级和强度选择）
         """
-        buy_signals = []
-        sell_signals = []
-
-        for rule in self.rules:
-            signal = self.evaluate(rule, df, current_price)
-            if signal:
-                if signal["signal_type"] == "buy":
-                    buy_signals.append(signal)
-                elif signal["signal_type"] == "sell":
-                    sell_signals.append(signal)
+        best_buy = None
+        best_sell = None
+
+        # 当日与前一日指标一次算出，所有规则共用；没有规则引用的指标不计算
+        indicators = calc_all_indicators(df, which=self.required_indicators, with_prev=True)
+        prev_values = indicators.get("prev_indicators")
+        prev_indicators = {"indicators": prev_values} if prev_values is not None else None
+
+        # 条件解析器和价位计算器只依赖当日指标与当前价格，所有规则共用一组实例
+        price = current_price if current_price is not None else indicators.get("current_price", 0)
+        rules = self._parsed_rules if price else []
+        parser = ConditionParser(indicators, df, prev_indicators)
+        calculator = PriceCalculator(indicators, price, parser._values)
+
+        # 规则已按优先级降序排列：买入信号优先于卖出信号，同类按 (优先级, 强度) 取最大，并列取先出现者
+        for rule, config in rules:
+            if best_buy is not None:
+                # 已有买入信号：更低优先级的规则不可能胜出，卖出规则也无需再评估
+                if rule.priority < best_buy["priority"]:
+                    break
+                if rule.rule_type != "buy":
+                    continue
+
+            signal = self._evaluate_parsed(rule, config, parser, calculator)
+            if not signal:
+                continue
+
+            rank = (signal["priority"], signal["strength"])
+            if signal["signal_type"] == "buy":
+                if best_buy is None or rank > (best_buy["priority"], best_buy["strength"]):
+                    best_buy = signal
+            elif signal["signal_type"] == "sell":
+                if best_sell is None or rank > (best_sell["priority"], best_sell["strength"]):
+                    best_sell = signal
 
         # 选择信号：优先返回买入信号（如果有）
-        if buy_signals:
-            # 按优先级和强度排序，选择最佳
-            best = max(buy_signals, key=lambda x: (x["priority"], x["strength"]))
-            return best
+        if best_buy:
+            return best_buy
 
-        if sell_signals:
-            best = max(sell_signals, key=lambda x: (x["priority"], x["strength"]))
-            return best
+        if best_sell:
+            return best_sell
 
         # 无信号，返回 hold
-        indicators = calc_all_indicators(df)
         return {
             "signal_type": "hold",
             "current_price": current_price or indicators.get("current_price"),
@@ -383,178 +610,187 @@ class RuleEngine:
         }
 
 
+def _dumps(obj: Any) -> str:
+    """序列化规则配置为 JSON 字符串"""
+    return orjson.dumps(obj).decode()
+
+
+# 默认规则配置（8条：4买4卖），JSON 字段在模块加载时序列化一次
+_DEFAULT_RULES: Tuple[Dict[str, Any], ...] = (
+    # ============ 买入规则 ============
+    {
+        "name": "MA金叉买入",
+        "rule_type": "buy",
+        "enabled": True,
+        "priority": 3,
+        "strength": 3,
+        "conditions": _dumps([{
+                "indicator": "MA",
+                "field": "MA5",
+                "operator": "cross_above",
+                "target_type": "indicator",
+                "target_indicator": "MA",
+                "target_field": "MA20"
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "indicator", "indicator": "MA", "field": "MA20"},
+            "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
+            "take_profit": {"type": "percentage", "base": "entry", "value": 0.08}
+        }),
+        "description_template": "MA5上穿MA20，建议在MA20附近{entry_price:.2f}买入"
+    },
+    {
+        "name": "RSI超卖买入",
+        "rule_type": "buy",
+        "enabled": True,
+        "priority": 2,
+        "strength": 2,
+        "conditions": _dumps([{
+                "indicator": "RSI",
+                "field": "RSI",
+                "operator": "lt",
+                "target_type": "value",
+                "target_value": 30
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "percentage", "value": -0.02},
+            "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
+            "take_profit": {"type": "percentage", "base": "entry", "value": 0.05}
+        }),
+        "description_template": "RSI低于30，超卖区间，建议逢低买入"
+    },
+    {
+        "name": "布林下轨买入",
+        "rule_type": "buy",
+        "enabled": True,
+        "priority": 3,
+        "strength": 3,
+        "conditions": _dumps([{
+                "indicator": "Bollinger",
+                "field": "lower",
+                "operator": "gt",
+                "target_type": "value",
+                "target_value": 0  # 占位，实际在 ConditionParser 中处理价格与下轨比较
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "indicator", "indicator": "Bollinger", "field": "lower"},
+            "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
+            "take_profit": {"type": "indicator", "indicator": "Bollinger", "field": "middle"}
+        }),
+        "description_template": "价格跌破布林下轨，可能反弹"
+    },
+    {
+        "name": "MACD金叉买入",
+        "rule_type": "buy",
+        "enabled": True,
+        "priority": 2,
+        "strength": 2,
+        "conditions": _dumps([{
+                "indicator": "MACD",
+                "field": "DIF",
+                "operator": "cross_above",
+                "target_type": "indicator",
+                "target_indicator": "MACD",
+                "target_field": "DEA"
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "current"},
+            "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
+            "take_profit": {"type": "percentage", "base": "entry", "value": 0.08}
+        }),
+        "description_template": "MACD金叉形成，趋势可能转强"
+    },
+    # ============ 卖出规则 ============
+    {
+        "name": "MA死叉卖出",
+        "rule_type": "sell",
+        "enabled": True,
+        "priority": 3,
+        "strength": 3,
+        "conditions": _dumps([{
+                "indicator": "MA",
+                "field": "MA5",
+                "operator": "cross_below",
+                "target_type": "indicator",
+                "target_indicator": "MA",
+                "target_field": "MA20"
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "indicator", "indicator": "MA", "field": "MA20"},
+            "stop_loss": None,
+            "take_profit": {"type": "percentage", "base": "entry", "value": -0.05}
+        }),
+        "description_template": "MA5下穿MA20，建议在MA20附近{entry_price:.2f}减仓"
+    },
+    {
+        "name": "RSI超买卖出",
+        "rule_type": "sell",
+        "enabled": True,
+        "priority": 2,
+        "strength": 2,
+        "conditions": _dumps([{
+                "indicator": "RSI",
+                "field": "RSI",
+                "operator": "gt",
+                "target_type": "value",
+                "target_value": 70
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "percentage", "value": 0.02},
+            "stop_loss": None,
+            "take_profit": {"type": "percentage", "base": "entry", "value": -0.02}
+        }),
+        "description_template": "RSI高于70，超买区间，建议逢高减仓"
+    },
+    {
+        "name": "布林上轨卖出",
+        "rule_type": "sell",
+        "enabled": True,
+        "priority": 3,
+        "strength": 3,
+        "conditions": _dumps([{
+                "indicator": "Bollinger",
+                "field": "upper",
+                "operator": "lt",
+                "target_type": "value",
+                "target_value": 0  # 占位
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "indicator", "indicator": "Bollinger", "field": "upper"},
+            "stop_loss": None,
+            "take_profit": {"type": "indicator", "indicator": "Bollinger", "field": "middle"}
+        }),
+        "description_template": "价格突破布林上轨，可能回调"
+    },
+    {
+        "name": "MACD死叉卖出",
+        "rule_type": "sell",
+        "enabled": True,
+        "priority": 2,
+        "strength": 2,
+        "conditions": _dumps([{
+                "indicator": "MACD",
+                "field": "DIF",
+                "operator": "cross_below",
+                "target_type": "indicator",
+                "target_indicator": "MACD",
+                "target_field": "DEA"
+            }]),
+        "price_config": _dumps({
+            "entry": {"type": "current"},
+            "stop_loss": None,
+            "take_profit": {"type": "percentage", "base": "entry", "value": -0.05}
+        }),
+        "description_template": "MACD死叉形成，趋势可能转弱"
+    }
+)
+
+
 def get_default_rules() -> List[Dict[str, Any]]:
     """
     获取默认规则配置（8条：4买4卖）
 
     Returns:
-        默认规则配置列表
+        默认规则配置列表（每次返回新的字典，字段值均为不可变类型，浅拷贝即可）
     """
-    return [
-        # ============ 买入规则 ============
-        {
-            "name": "MA金叉买入",
-            "rule_type": "buy",
-            "enabled": True,
-            "priority": 3,
-            "strength": 3,
-            "conditions": json.dumps([{
-                    "indicator": "MA",
-                    "field": "MA5",
-                    "operator": "cross_above",
-                    "target_type": "indicator",
-                    "target_indicator": "MA",
-                    "target_field": "MA20"
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "indicator", "indicator": "MA", "field": "MA20"},
-                "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
-                "take_profit": {"type": "percentage", "base": "entry", "value": 0.08}
-            }),
-            "description_template": "MA5上穿MA20，建议在MA20附近{entry_price:.2f}买入"
-        },
-        {
-            "name": "RSI超卖买入",
-            "rule_type": "buy",
-            "enabled": True,
-            "priority": 2,
-            "strength": 2,
-            "conditions": json.dumps([{
-                    "indicator": "RSI",
-                    "field": "RSI",
-                    "operator": "lt",
-                    "target_type": "value",
-                    "target_value": 30
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "percentage", "value": -0.02},
-                "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
-                "take_profit": {"type": "percentage", "base": "entry", "value": 0.05}
-            }),
-            "description_template": "RSI低于30，超卖区间，建议逢低买入"
-        },
-        {
-            "name": "布林下轨买入",
-            "rule_type": "buy",
-            "enabled": True,
-            "priority": 3,
-            "strength": 3,
-            "conditions": json.dumps([{
-                    "indicator": "Bollinger",
-                    "field": "lower",
-                    "operator": "gt",
-                    "target_type": "value",
-                    "target_value": 0  # 占位，实际在 ConditionParser 中处理价格与下轨比较
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "indicator", "indicator": "Bollinger", "field": "lower"},
-                "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
-                "take_profit": {"type": "indicator", "indicator": "Bollinger", "field": "middle"}
-            }),
-            "description_template": "价格跌破布林下轨，可能反弹"
-        },
-        {
-            "name": "MACD金叉买入",
-            "rule_type": "buy",
-            "enabled": True,
-            "priority": 2,
-            "strength": 2,
-            "conditions": json.dumps([{
-                    "indicator": "MACD",
-                    "field": "DIF",
-                    "operator": "cross_above",
-                    "target_type": "indicator",
-                    "target_indicator": "MACD",
-                    "target_field": "DEA"
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "current"},
-                "stop_loss": {"type": "percentage", "base": "entry", "value": -0.05},
-                "take_profit": {"type": "percentage", "base": "entry", "value": 0.08}
-            }),
-            "description_template": "MACD金叉形成，趋势可能转强"
-        },
-        # ============ 卖出规则 ============
-        {
-            "name": "MA死叉卖出",
-            "rule_type": "sell",
-            "enabled": True,
-            "priority": 3,
-            "strength": 3,
-            "conditions": json.dumps([{
-                    "indicator": "MA",
-                    "field": "MA5",
-                    "operator": "cross_below",
-                    "target_type": "indicator",
-                    "target_indicator": "MA",
-                    "target_field": "MA20"
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "indicator", "indicator": "MA", "field": "MA20"},
-                "stop_loss": None,
-                "take_profit": {"type": "percentage", "base": "entry", "value": -0.05}
-            }),
-            "description_template": "MA5下穿MA20，建议在MA20附近{entry_price:.2f}减仓"
-        },
-        {
-            "name": "RSI超买卖出",
-            "rule_type": "sell",
-            "enabled": True,
-            "priority": 2,
-            "strength": 2,
-            "conditions": json.dumps([{
-                    "indicator": "RSI",
-                    "field": "RSI",
-                    "operator": "gt",
-                    "target_type": "value",
-                    "target_value": 70
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "percentage", "value": 0.02},
-                "stop_loss": None,
-                "take_profit": {"type": "percentage", "base": "entry", "value": -0.02}
-            }),
-            "description_template": "RSI高于70，超买区间，建议逢高减仓"
-        },
-        {
-            "name": "布林上轨卖出",
-            "rule_type": "sell",
-            "enabled": True,
-            "priority": 3,
-            "strength": 3,
-            "conditions": json.dumps([{
-                    "indicator": "Bollinger",
-                    "field": "upper",
-                    "operator": "lt",
-                    "target_type": "value",
-                    "target_value": 0  # 占位
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "indicator", "indicator": "Bollinger", "field": "upper"},
-                "stop_loss": None,
-                "take_profit": {"type": "indicator", "indicator": "Bollinger", "field": "middle"}
-            }),
-            "description_template": "价格突破布林上轨，可能回调"
-        },
-        {
-            "name": "MACD死叉卖出",
-            "rule_type": "sell",
-            "enabled": True,
-            "priority": 2,
-            "strength": 2,
-            "conditions": json.dumps([{
-                    "indicator": "MACD",
-                    "field": "DIF",
-                    "operator": "cross_below",
-                    "target_type": "indicator",
-                    "target_indicator": "MACD",
-                    "target_field": "DEA"
-                }]),
-            "price_config": json.dumps({
-                "entry": {"type": "current"},
-                "stop_loss": None,
-                "take_profit": {"type": "percentage", "base": "entry", "value": -0.05}
-            }),
-            "description_template": "MACD死叉形成，趋势可能转弱"
-        }
-    ]
+    return [dict(rule) for rule in _DEFAULT_RULES]
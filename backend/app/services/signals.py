@@ -8,7 +8,8 @@
 """
 
 import logging
-import json
+import orjson
+from collections import defaultdict
 from typing import Optional, List, Dict, Any, TYPE_CHECKING
 from datetime import date, datetime
 
@@ -20,16 +21,29 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# 数据库规则对应的规则引擎：(规则表版本, RuleEngine)，规则表未变化时复用，无需逐只股票重新查询
+_db_rule_engine: Optional[tuple] = None
+
 
 # ============ 硬编码信号检测（保留作为 fallback） ============
 
-def detect_buy_signals(indicators: Dict[str, Any], current_price: float) -> List[Dict[str, Any]]:
+def _group_signals_by_type(all_signals: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """将指标信号按 type 分组（保持原顺序），买卖检测各规则直接按类型取用"""
+    grouped = defaultdict(list)
+    for signal in all_signals:
+        grouped[signal.get("type")].append(signal)
+    return grouped
+
+
+def detect_buy_signals(indicators: Dict[str, Any], current_price: float,
+                        signals_by_type: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
     """
     检测买入信号（硬编码规则，作为 fallback）
 
     Args:
         indicators: 技术指标计算结果
         current_price: 当前价格
+        signals_by_type: 按类型分组的指标信号（可选，由 _group_signals_by_type 生成，买卖检测共用）
 
     Returns:
         List[Dict]: 买入信号列表
@@ -37,11 +51,12 @@ def detect_buy_signals(indicators: Dict[str, Any], current_price: float) -> List
     signals = []
     ma_indicators = indicators.get("indicators", {}).get("MA", {})
     boll_indicators = indicators.get("indicators", {}).get("Bollinger", {})
-    all_signals = indicators.get("signals", [])
+    if signals_by_type is None:
+        signals_by_type = _group_signals_by_type(indicators.get("signals", []))
 
     # 1. MA 金叉买入
-    for signal in all_signals:
-        if signal.get("type") == "golden_cross" and "MA" in signal.get("name", ""):
+    for signal in signals_by_type.get("golden_cross", ()):
+        if "MA" in signal.get("name", ""):
             ma20_price = ma_indicators.get("MA20", current_price)
             signals.append({
                 "trigger": "MA金叉",
@@ -53,35 +68,33 @@ def detect_buy_signals(indicators: Dict[str, Any], current_price: float) -> List
             })
 
     # 2. RSI 超卖买入
-    for signal in all_signals:
-        if signal.get("type") == "oversold":
-            rsi_value = signal.get("value", 0)
-            entry = round(current_price * 0.98, 2)
-            signals.append({
-                "trigger": "RSI超卖",
-                "entry_price": entry,
-                "stop_loss": round(entry * 0.95, 2),
-                "take_profit": round(current_price * 1.05, 2),
-                "strength": 2,
-                "description": f"RSI={rsi_value:.1f}，超卖区间，建议逢低买入"
-            })
+    for signal in signals_by_type.get("oversold", ()):
+        rsi_value = signal.get("value", 0)
+        entry = round(current_price * 0.98, 2)
+        signals.append({
+            "trigger": "RSI超卖",
+            "entry_price": entry,
+            "stop_loss": round(entry * 0.95, 2),
+            "take_profit": round(current_price * 1.05, 2),
+            "strength": 2,
+            "description": f"RSI={rsi_value:.1f}，超卖区间，建议逢低买入"
+        })
 
     # 3. 布林下轨买入
-    for signal in all_signals:
-        if signal.get("type") == "below_lower":
-            lower_price = signal.get("price", current_price)
-            signals.append({
-                "trigger": "跌破布林下轨",
-                "entry_price": round(lower_price, 2),
-                "stop_loss": round(lower_price * 0.95, 2),
-                "take_profit": round(boll_indicators.get("middle", current_price), 2),
-                "strength": 3,
-                "description": f"价格跌破布林下轨{lower_price:.2f}，可能反弹"
-            })
+    for signal in signals_by_type.get("below_lower", ()):
+        lower_price = signal.get("price", current_price)
+        signals.append({
+            "trigger": "跌破布林下轨",
+            "entry_price": round(lower_price, 2),
+            "stop_loss": round(lower_price * 0.95, 2),
+            "take_profit": round(boll_indicators.get("middle", current_price), 2),
+            "strength": 3,
+            "description": f"价格跌破布林下轨{lower_price:.2f}，可能反弹"
+        })
 
     # 4. MACD 金叉买入
-    for signal in all_signals:
-        if signal.get("type") == "golden_cross" and "MACD" in signal.get("name", ""):
+    for signal in signals_by_type.get("golden_cross", ()):
+        if "MACD" in signal.get("name", ""):
             signals.append({
                 "trigger": "MACD金叉",
                 "entry_price": round(current_price, 2),
@@ -94,13 +107,15 @@ def detect_buy_signals(indicators: Dict[str, Any], current_price: float) -> List
     return signals
 
 
-def detect_sell_signals(indicators: Dict[str, Any], current_price: float) -> List[Dict[str, Any]]:
+def detect_sell_signals(indicators: Dict[str, Any], current_price: float,
+                        signals_by_type: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
     """
     检测卖出信号（硬编码规则，作为 fallback）
 
     Args:
         indicators: 技术指标计算结果
         current_price: 当前价格
+        signals_by_type: 按类型分组的指标信号（可选，由 _group_signals_by_type 生成，买卖检测共用）
 
     Returns:
         List[Dict]: 卖出信号列表
@@ -108,11 +123,12 @@ def detect_sell_signals(indicators: Dict[str, Any], current_price: float) -> Lis
     signals = []
     ma_indicators = indicators.get("indicators", {}).get("MA", {})
     boll_indicators = indicators.get("indicators", {}).get("Bollinger", {})
-    all_signals = indicators.get("signals", [])
+    if signals_by_type is None:
+        signals_by_type = _group_signals_by_type(indicators.get("signals", []))
 
     # 1. MA 死叉卖出
-    for signal in all_signals:
-        if signal.get("type") == "dead_cross" and "MA" in signal.get("name", ""):
+    for signal in signals_by_type.get("dead_cross", ()):
+        if "MA" in signal.get("name", ""):
             ma20_price = ma_indicators.get("MA20", current_price)
             signals.append({
                 "trigger": "MA死叉",
@@ -124,35 +140,33 @@ def detect_sell_signals(indicators: Dict[str, Any], current_price: float) -> Lis
             })
 
     # 2. RSI 超买卖出
-    for signal in all_signals:
-        if signal.get("type") == "overbought":
-            rsi_value = signal.get("value", 0)
-            exit_price = round(current_price * 1.02, 2)
-            signals.append({
-                "trigger": "RSI超买",
-                "entry_price": exit_price,
-                "stop_loss": None,
-                "take_profit": round(current_price * 0.98, 2),
-                "strength": 2,
-                "description": f"RSI={rsi_value:.1f}，超买区间，建议逢高减仓"
-            })
+    for signal in signals_by_type.get("overbought", ()):
+        rsi_value = signal.get("value", 0)
+        exit_price = round(current_price * 1.02, 2)
+        signals.append({
+            "trigger": "RSI超买",
+            "entry_price": exit_price,
+            "stop_loss": None,
+            "take_profit": round(current_price * 0.98, 2),
+            "strength": 2,
+            "description": f"RSI={rsi_value:.1f}，超买区间，建议逢高减仓"
+        })
 
     # 3. 布林上轨卖出
-    for signal in all_signals:
-        if signal.get("type") == "above_upper":
-            upper_price = signal.get("price", current_price)
-            signals.append({
-                "trigger": "突破布林上轨",
-                "entry_price": round(upper_price, 2),
-                "stop_loss": None,
-                "take_profit": round(boll_indicators.get("middle", current_price), 2),
-                "strength": 3,
-                "description": f"价格突破布林上轨{upper_price:.2f}，可能回调"
-            })
+    for signal in signals_by_type.get("above_upper", ()):
+        upper_price = signal.get("price", current_price)
+        signals.append({
+            "trigger": "突破布林上轨",
+            "entry_price": round(upper_price, 2),
+            "stop_loss": None,
+            "take_profit": round(boll_indicators.get("middle", current_price), 2),
+            "strength": 3,
+            "description": f"价格突破布林上轨{upper_price:.2f}，可能回调"
+        })
 
     # 4. MACD 死叉卖出
-    for signal in all_signals:
-        if signal.get("type") == "dead_cross" and "MACD" in signal.get("name", ""):
+    for signal in signals_by_type.get("dead_cross", ()):
+        if "MACD" in signal.get("name", ""):
             signals.append({
                 "trigger": "MACD死叉",
                 "entry_price": round(current_price, 2),
@@ -167,7 +181,8 @@ def detect_sell_signals(indicators: Dict[str, Any], current_price: float) -> Lis
 
 # ============ 信号生成函数 ============
 
-def generate_signal(df, current_price: Optional[float] = None, rules: Optional[List] = None) -> Dict[str, Any]:
+def generate_signal(df, current_price: Optional[float] = None, rules: Optional[List] = None,
+                    engine: Optional[RuleEngine] = None) -> Dict[str, Any]:
     """
     生成综合买卖信号
 
@@ -175,6 +190,7 @@ def generate_signal(df, current_price: Optional[float] = None, rules: Optional[L
         df: K线数据 DataFrame
         current_price: 当前价格（可选，默认使用最新收盘价）
         rules: 交易规则列表（可选，传入则使用规则引擎，否则使用硬编码逻辑）
+        engine: 预先构建的规则引擎（可选，批量计算多只股票时共用，优先于 rules）
 
     Returns:
         Dict: 综合信号结果
@@ -192,26 +208,27 @@ def generate_signal(df, current_price: Optional[float] = None, rules: Optional[L
         }
 
     # 如果传入了规则，使用规则引擎
+    if engine is not None:
+        return _generate_signal_with_engine(df, current_price, engine)
     if rules is not None:
-        return _generate_signal_with_engine(df, current_price, rules)
+        return _generate_signal_with_engine(df, current_price, RuleEngine(rules))
 
     # 否则使用硬编码逻辑（向后兼容）
     return _generate_signal_legacy(df, current_price)
 
 
-def _generate_signal_with_engine(df, current_price: Optional[float], rules: List) -> Dict[str, Any]:
+def _generate_signal_with_engine(df, current_price: Optional[float], engine: RuleEngine) -> Dict[str, Any]:
     """
     使用规则引擎生成信号
 
     Args:
         df: K线数据 DataFrame
         current_price: 当前价格
-        rules: 交易规则列表
+        engine: 规则引擎
 
     Returns:
         Dict: 信号结果
     """
-    engine = RuleEngine(rules)
     signal = engine.evaluate_all(df, current_price)
 
     # 确保返回格式与旧接口兼容
@@ -247,8 +264,9 @@ def _generate_signal_legacy(df, current_price: Optional[float]) -> Dict[str, Any
         current_price = indicators.get("current_price", 0)
 
     # 检测买入和卖出信号
-    buy_signals = detect_buy_signals(indicators, current_price)
-    sell_signals = detect_sell_signals(indicators, current_price)
+    signals_by_type = _group_signals_by_type(indicators.get("signals", []))
+    buy_signals = detect_buy_signals(indicators, current_price, signals_by_type)
+    sell_signals = detect_sell_signals(indicators, current_price, signals_by_type)
 
     # 综合判断
     if len(buy_signals) > len(sell_signals):
@@ -309,16 +327,47 @@ def generate_signal_with_db(df, db: "Session", current_price: Optional[float] =
     Returns:
         Dict: 综合信号结果
     """
-    from ..models import TradingRule
+    engine = _get_db_rule_engine(db)
 
-    # 从数据库加载启用的规则
-    rules = db.query(TradingRule).filter(TradingRule.enabled == True).all()
-
-    if not rules:
+    if engine is None:
         logger.warning("数据库中没有启用的交易规则，使用默认硬编码逻辑")
         return generate_signal(df, current_price)
 
-    return generate_signal(df, current_price, rules=rules)
+    return generate_signal(df, current_price, engine=engine)
+
+
+def _get_db_rule_engine(db: "Session") -> Optional[RuleEngine]:
+    """
+    获取数据库规则对应的规则引擎
+
+    规则表版本由 (行数, 最大 ID, 最大更新时间) 一次聚合查询得到，
+    规则的增删改（含启用/禁用）都会改变版本，版本不变时直接复用已构建的规则引擎。
+
+    Args:
+        db: 数据库 Session
+
+    Returns:
+        RuleEngine，没有启用的规则时返回 None
+    """
+    global _db_rule_engine
+    from sqlalchemy import func
+    from ..models import TradingRule
+
+    version = tuple(db.query(
+        func.count(TradingRule.id), func.max(TradingRule.id), func.max(TradingRule.updated_at)
+    ).one())
+    cached = _db_rule_engine
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # 从数据库加载启用的规则；从 Session 中分离，缓存的引擎不受 Session 提交/关闭影响
+    rules = db.query(TradingRule).filter(TradingRule.enabled == True).all()
+    for rule in rules:
+        db.expunge(rule)
+
+    engine = RuleEngine(rules) if rules else None
+    _db_rule_engine = (version, engine)
+    return engine
 
 
 def format_signal_for_db(signal_result: Dict[str, Any], stock_id: int, signal_date: date) -> Dict[str, Any]:
@@ -342,6 +391,6 @@ def format_signal_for_db(signal_result: Dict[str, Any], stock_id: int, signal_da
         "stop_loss": signal_result.get("stop_loss"),
         "take_profit": signal_result.get("take_profit"),
         "strength": signal_result["strength"],
-        "triggers": json.dumps(signal_result["triggers"], ensure_ascii=False),
-        "indicators": json.dumps(signal_result.get("indicators", {}), ensure_ascii=False),
+        "triggers": orjson.dumps(signal_result["triggers"]).decode(),
+        "indicators": orjson.dumps(signal_result.get("indicators", {})).decode(),
     }
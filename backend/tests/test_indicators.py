@@ -0,0 +1,289 @@
+"""
+技术指标计算等价性测试
+
+calc_* 已改为基于 NumPy 的实现，这里与原 pandas 公式逐一对比：
+随机序列、前导/中间 NaN、无波动窗口（RSI 0/0、KDJ 最高价==最低价），以及 20/21 根 K 线边界。
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import indicators
+from app.services.indicators import (
+    _ema,
+    calc_bollinger,
+    calc_kdj,
+    calc_ma,
+    calc_macd,
+    calc_rsi,
+)
+
+
+# ============ 原 pandas 实现（对照基准） ============
+
+def _ref_ma(df, periods=(5, 10, 20, 60)):
+    if len(df) < max(periods):
+        return {"values": {}, "signals": []}
+    result = {"values": {}, "signals": []}
+    close = df['close']
+    for period in periods:
+        result["values"][f"MA{period}"] = round(float(close.rolling(window=period).mean().iloc[-1]), 2)
+    ma5 = close.rolling(window=5).mean()
+    ma20 = close.rolling(window=20).mean()
+    prev_ma5, prev_ma20 = ma5.iloc[-2], ma20.iloc[-2]
+    curr_ma5, curr_ma20 = ma5.iloc[-1], ma20.iloc[-1]
+    if prev_ma5 <= prev_ma20 and curr_ma5 > curr_ma20:
+        result["signals"].append({"type": "golden_cross", "name": "MA金叉", "period": "MA5/MA20",
+                                  "price": round(float(curr_ma20), 2)})
+    elif prev_ma5 >= prev_ma20 and curr_ma5 < curr_ma20:
+        result["signals"].append({"type": "dead_cross", "name": "MA死叉", "period": "MA5/MA20",
+                                  "price": round(float(curr_ma20), 2)})
+    return result
+
+
+def _ref_macd(df, fast=12, slow=26, signal=9):
+    if len(df) < slow + signal:
+        return {"values": {}, "signals": []}
+    result = {"values": {}, "signals": []}
+    close = df['close']
+    dif = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+    dea = dif.ewm(span=signal, adjust=False).mean()
+    macd_hist = 2 * (dif - dea)
+    result["values"] = {
+        "DIF": round(float(dif.iloc[-1]), 4),
+        "DEA": round(float(dea.iloc[-1]), 4),
+        "MACD": round(float(macd_hist.iloc[-1]), 4),
+    }
+    prev_dif, prev_dea = dif.iloc[-2], dea.iloc[-2]
+    curr_dif, curr_dea = dif.iloc[-1], dea.iloc[-1]
+    if prev_dif <= prev_dea and curr_dif > curr_dea:
+        result["signals"].append({"type": "golden_cross", "name": "MACD金叉", "price": None})
+    elif prev_dif >= prev_dea and curr_dif < curr_dea:
+        result["signals"].append({"type": "dead_cross", "name": "MACD死叉", "price": None})
+    return result
+
+
+def _ref_rsi(df, period=14):
+    if len(df) < period + 1:
+        return {"values": {}, "signals": []}
+    result = {"values": {}, "signals": []}
+    delta = df['close'].diff()
+    gain = delta.where(delta > 0, 0)
+    loss = (-delta).where(delta < 0, 0)
+    rs = gain.rolling(window=period).mean() / loss.rolling(window=period).mean()
+    rsi_value = (100 - (100 / (1 + rs))).iloc[-1]
+    result["values"] = {"RSI": round(float(rsi_value), 2)}
+    if rsi_value < 30:
+        result["signals"].append({"type": "oversold", "name": "RSI超卖",
+                                  "value": round(float(rsi_value), 2), "threshold": 30})
+    elif rsi_value > 70:
+        result["signals"].append({"type": "overbought", "name": "RSI超买",
+                                  "value": round(float(rsi_value), 2), "threshold": 70})
+    return result
+
+
+def _ref_kdj(df, n=9, m1=3, m2=3):
+    if len(df) < n:
+        return {"values": {}, "signals": []}
+    result = {"values": {}, "signals": []}
+    low_n = df['low'].rolling(window=n).min()
+    high_n = df['high'].rolling(window=n).max()
+    rsv = (df['close'] - low_n) / (high_n - low_n) * 100
+    k = rsv.ewm(alpha=1 / m1, adjust=False).mean()
+    d = k.ewm(alpha=1 / m2, adjust=False).mean()
+    j = 3 * k - 2 * d
+    result["values"] = {
+        "K": round(float(k.iloc[-1]), 2),
+        "D": round(float(d.iloc[-1]), 2),
+        "J": round(float(j.iloc[-1]), 2),
+    }
+    if len(k) >= 2:
+        prev_k, prev_d = k.iloc[-2], d.iloc[-2]
+        curr_k, curr_d = k.iloc[-1], d.iloc[-1]
+        if prev_k <= prev_d and curr_k > curr_d:
+            result["signals"].append({"type": "golden_cross", "name": "KDJ金叉", "price": None})
+        elif prev_k >= prev_d and curr_k < curr_d:
+            result["signals"].append({"type": "dead_cross", "name": "KDJ死叉", "price": None})
+    return result
+
+
+def _ref_bollinger(df, period=20, std_dev=2.0):
+    if len(df) < period:
+        return {"values": {}, "signals": []}
+    result = {"values": {}, "signals": []}
+    close = df['close']
+    middle = close.rolling(window=period).mean()
+    std = close.rolling(window=period).std()
+    upper_val = (middle + std_dev * std).iloc[-1]
+    lower_val = (middle - std_dev * std).iloc[-1]
+    middle_val = middle.iloc[-1]
+    current_price = close.iloc[-1]
+    result["values"] = {
+        "upper": round(float(upper_val), 2),
+        "middle": round(float(middle_val), 2),
+        "lower": round(float(lower_val), 2),
+        "width": round(float(upper_val - lower_val), 2),
+    }
+    if current_price < lower_val:
+        result["signals"].append({"type": "below_lower", "name": "跌破布林下轨",
+                                  "price": round(float(lower_val), 2)})
+    elif current_price > upper_val:
+        result["signals"].append({"type": "above_upper", "name": "突破布林上轨",
+                                  "price": round(float(upper_val), 2)})
+    return result
+
+
+CASES = [
+    (calc_ma, _ref_ma),
+    (calc_macd, _ref_macd),
+    (calc_rsi, _ref_rsi),
+    (calc_kdj, _ref_kdj),
+    (calc_bollinger, _ref_bollinger),
+]
+
+
+# ============ 测试数据 ============
+
+def _frame(close, spread=None):
+    """由收盘价构建 K 线 DataFrame，spread 为最高/最低价相对收盘价的偏移"""
+    close = np.asarray(close, dtype=np.float64)
+    if spread is None:
+        spread = np.zeros(len(close))
+    return pd.DataFrame({
+        'open': close,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': np.zeros(len(close), dtype=np.int64),
+    })
+
+
+def _random_frame(length, seed):
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.3, length))
+    spread = rng.uniform(0, 0.2, length)
+    return _frame(close, spread)
+
+
+def _with_nan(df, positions):
+    df = df.copy()
+    for pos in positions:
+        df.loc[df.index[pos], ['high', 'low', 'close']] = np.nan
+    return df
+
+
+def _flat_tail_frame(length, tail, seed):
+    """前段随机、最后 tail 根 K 线价格不变（RSI 0/0、KDJ 最高价==最低价、布林带标准差为 0）"""
+    df = _random_frame(length, seed)
+    df.loc[df.index[-tail:], ['open', 'high', 'low', 'close']] = 12.34
+    return df
+
+
+FRAMES = {
+    **{f"random_{n}_{seed}": _random_frame(n, seed)
+       for n in (5, 9, 14, 15, 19, 20, 21, 34, 35, 59, 60, 61, 120) for seed in (0, 1, 2)},
+    "leading_nan": _with_nan(_random_frame(80, 3), range(5)),
+    "interior_nan_early": _with_nan(_random_frame(80, 4), [20]),
+    "interior_nan_in_rsi_window": _with_nan(_random_frame(80, 5), [-5]),
+    "interior_nan_in_kdj_window": _with_nan(_random_frame(80, 6), [-3]),
+    "last_bar_nan": _with_nan(_random_frame(80, 7), [-1]),
+    "flat_all": _frame(np.full(70, 8.8)),
+    "flat_tail_rsi": _flat_tail_frame(70, 15, 8),
+    "flat_tail_kdj": _flat_tail_frame(70, 9, 9),
+    "flat_tail_boll": _flat_tail_frame(70, 20, 10),
+}
+
+
+# 数值比较允许一个末位的舍入差异（MACD 保留 4 位小数，其余保留 2 位）
+_TOLERANCE = {"DIF": 1.01e-4, "DEA": 1.01e-4, "MACD": 1.01e-4}
+
+
+def _assert_result_equal(actual, expected):
+    """比较指标结果：数值允许末位舍入差异，NaN 与 NaN 视为相等，信号须完全一致"""
+    assert actual["values"].keys() == expected["values"].keys()
+    for key, exp in expected["values"].items():
+        act = actual["values"][key]
+        if isinstance(exp, float) and math.isnan(exp):
+            assert math.isnan(act), key
+        else:
+            assert act == pytest.approx(exp, abs=_TOLERANCE.get(key, 1.01e-2)), key
+
+    assert [s["type"] for s in actual["signals"]] == [s["type"] for s in expected["signals"]]
+    for act, exp in zip(actual["signals"], expected["signals"]):
+        for key, value in exp.items():
+            if isinstance(value, float):
+                assert act[key] == pytest.approx(value, abs=1.01e-2), key
+            else:
+                assert act[key] == value, key
+
+
+# ============ 测试 ============
+
+@pytest.mark.parametrize("name", sorted(FRAMES))
+@pytest.mark.parametrize("calc, ref", CASES, ids=lambda f: f.__name__)
+def test_indicator_matches_pandas(calc, ref, name):
+    df = FRAMES[name]
+    _assert_result_equal(calc(df), ref(df))
+
+
+def test_ma_cross_boundary():
+    """MA 金叉/死叉在 20/21 根 K 线边界上与 pandas 一致（自定义周期时才会用到该边界）"""
+    for length in (20, 21, 22):
+        for seed in range(20):
+            df = _random_frame(length, seed)
+            _assert_result_equal(calc_ma(df, periods=[5, 20]), _ref_ma(df, periods=(5, 20)))
+
+
+@pytest.mark.parametrize("alpha", [2 / 13, 2 / 27, 2 / 10, 1 / 3])
+@pytest.mark.parametrize("pattern", ["random", "leading_nan", "interior_nan", "nan_run", "all_nan"])
+def test_ema_matches_pandas_ewm(alpha, pattern):
+    """_ema 与 pandas ewm(adjust=False) 全精度一致，包括 NaN 处的权重衰减"""
+    rng = np.random.default_rng(42)
+    values = rng.normal(10, 1, 50)
+    if pattern == "leading_nan":
+        values[:7] = np.nan
+    elif pattern == "interior_nan":
+        values[[10, 25, 49]] = np.nan
+    elif pattern == "nan_run":
+        values[20:30] = np.nan
+    elif pattern == "all_nan":
+        values[:] = np.nan
+
+    expected = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(_ema(values, alpha), expected, rtol=1e-12, equal_nan=True)
+
+
+def test_calc_accepts_indicator_ctx():
+    """传入 DataFrame 与传入预先提取的上下文结果一致"""
+    df = FRAMES["random_120_0"]
+    ctx = indicators._as_ctx(df)
+    for calc, _ in CASES:
+        assert calc(ctx) == calc(df)
+
+
+@pytest.mark.parametrize("pattern", ["random", "leading_nan", "interior_nan", "nan_run", "all_nan"])
+def test_numba_ema_kernel_matches_python(pattern):
+    """numba 编译的 EMA 内核与纯 Python 内核结果一致（未安装 numba 时跳过）"""
+    pytest.importorskip("numba")
+    assert indicators.njit is not None
+
+    rng = np.random.default_rng(7)
+    values = rng.normal(10, 1, 60)
+    if pattern == "leading_nan":
+        values[:7] = np.nan
+    elif pattern == "interior_nan":
+        values[[10, 25, 59]] = np.nan
+    elif pattern == "nan_run":
+        values[20:30] = np.nan
+    elif pattern == "all_nan":
+        values[:] = np.nan
+
+    for alpha in (2 / 13, 2 / 27, 2 / 10, 1 / 3):
+        expected = np.empty(len(values))
+        indicators._ema_kernel.py_func(values.tolist(), alpha, expected)
+        np.testing.assert_allclose(_ema(values, alpha), expected, rtol=1e-12, equal_nan=True)
+        pandas_expected = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(_ema(values, alpha), pandas_expected, rtol=1e-12, equal_nan=True)